@@ -0,0 +1,239 @@
+import numpy as np
+import pandas as pd
+
+
+# --- MOYENNES PONDÉRÉES PAR LES OCCURRENCES ---
+# sum(valeur * poids) / sum(poids) pour plusieurs colonnes en un seul groupby :
+# les produits valeur * poids sont calculés une fois sur toute la colonne, puis simplement sommés par groupe.
+# Une valeur (ou un poids) manquante n'entre ni au numérateur ni au dénominateur de sa colonne.
+def weighted_mean(frame, by, values, weight='occurrences'):
+    by = [by] if isinstance(by, str) else list(by)
+    work = {column: frame[column] for column in by}
+    work[weight] = frame[weight]
+    work.update(additive_columns(frame, values, weight, simple=False))
+
+    sums = pd.DataFrame(work, index=frame.index).groupby(by, as_index=False, observed=True, sort=True).sum()
+
+    result = sums[by + [weight]].copy()
+    for column in values:
+        result[column] = _ratio(sums[f"{column}__vw"], sums[f"{column}__w"])
+    return result
+
+
+# --- COLONNES ADDITIVES ---
+# Par mesure : somme et nombre des valeurs présentes (moyenne simple), somme valeur * poids et somme des poids
+# (moyenne pondérée, valeur et poids présents). Ces colonnes s'additionnent sur n'importe quel regroupement :
+# une moyenne se recalcule à partir de sommes déjà faites, sans revenir aux lignes d'origine.
+# together=True : une ligne ne compte pour aucune des mesures si l'une d'elles manque (dropna sur toutes les colonnes).
+def additive_columns(frame, values, weight='occurrences', simple=True, together=False):
+    weights = frame[weight].to_numpy(dtype='float64')
+    if together:
+        all_present = ~np.isnan(frame[list(values)].to_numpy(dtype='float64')).any(axis=1)
+    columns = {}
+    for column in values:
+        value = frame[column].to_numpy(dtype='float64')
+        present = all_present if together else ~np.isnan(value)
+        valid = present & ~np.isnan(weights)
+        if simple:
+            columns[f"{column}__sum"] = np.where(present, value, 0.0)
+            columns[f"{column}__n"] = present.astype('int32')
+        columns[f"{column}__vw"] = np.where(valid, value * weights, 0.0)
+        columns[f"{column}__w"] = np.where(valid, weights, 0.0)
+    return columns
+
+
+def _ratio(numerator, denominator):
+    denominator = np.asarray(denominator, dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator != 0, np.asarray(numerator, dtype='float64') / denominator, np.nan)
+
+
+# Regroupement d'une table de colonnes additives : `sums` sont simplement sommées,
+# `means` redeviennent des moyennes (pondérées ou simples) ; une seule somme par colonne, aucun produit recalculé
+def roll_up(summary, by, sums=(), means=(), weighted=True):
+    by = [by] if isinstance(by, str) else list(by)
+    parts = ('__vw', '__w') if weighted else ('__sum', '__n')
+    columns = list(sums) + [f"{column}{part}" for column in means for part in parts]
+    totals = summary.groupby(by, as_index=False, observed=True, sort=True)[columns].sum()
+
+    result = totals[by + list(sums)].copy()
+    for column in means:
+        result[column] = _ratio(totals[f"{column}{parts[0]}"], totals[f"{column}{parts[1]}"])
+    return result
+
+
+# --- CRÉNEAUX HORAIRES ---
+# Les time_slot sont stockés en minutes depuis minuit (int16) dès le chargement ;
+# le texte "HH:MM" n'est produit qu'à la fin, pour l'axe des graphiques.
+def minute_of_day(values, offset_minutes=0):
+    if pd.api.types.is_timedelta64_dtype(values):
+        minutes = (values.dt.total_seconds() // 60).to_numpy(dtype='float64')
+    else:
+        # Conversion des valeurs distinctes seulement (quelques dizaines de créneaux), puis redistribution
+        codes, uniques = pd.factorize(values)
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce', format='mixed')
+        per_unique = (parsed.dt.hour * 60 + parsed.dt.minute).to_numpy(dtype='float64')
+        minutes = np.append(per_unique, np.nan)[codes]  # code -1 (valeur manquante) -> NaN
+    minutes = (minutes + offset_minutes) % (24 * 60)
+    return pd.Series(minutes, index=values.index).astype('Int16')
+
+
+# Libellés "HH:MM" d'une colonne de minutes, formatés une seule fois par créneau distinct
+def slot_labels(minutes):
+    codes, uniques = pd.factorize(minutes)
+    labels = np.array([f"{m // 60:02}:{m % 60:02}" for m in uniques.astype(int)] + [None], dtype=object)
+    return pd.Series(labels[codes], index=minutes.index)
+
+
+# --- DURÉES ---
+# Secondes -> "HH:MM:SS" (precision='seconds') ou "HH:MM" (precision='minutes') pour tout un tableau, en une passe numpy.
+# Les heures ne sont pas ramenées à 24 ("26:00:00"), les secondes sont tronquées, une durée négative garde son signe ;
+# une valeur manquante donne `missing`. Le tableau retourné (dtype object) a la forme de l'entrée.
+DURATION_PRECISIONS = {'hours': 1, 'minutes': 2, 'seconds': 3}
+_TWO_DIGITS = np.array([f"{i:02}" for i in range(100)], dtype=object)
+
+
+def format_duration(seconds, precision='seconds', missing=""):
+    values = np.asarray(seconds, dtype='float64')
+    valid = np.isfinite(values)
+    total = np.abs(np.where(valid, values, 0)).astype('int64')
+
+    hours = total // 3600
+    labels = _TWO_DIGITS[np.minimum(hours, 99)]
+    if (hours > 99).any():
+        labels = np.where(hours > 99, hours.astype(str).astype(object), labels)
+    for part in (total % 3600 // 60, total % 60)[:DURATION_PRECISIONS[precision] - 1]:
+        labels = labels + ':' + _TWO_DIGITS[part]
+
+    labels = np.where(values < 0, '-' + labels, labels)
+    labels[~valid] = missing
+    return labels
+
+
+# --- RÉDUCTION DU NOMBRE DE POINTS D'UNE SÉRIE ---
+# Retourne les positions des points à garder (triées, premier et dernier toujours inclus).
+# 'lttb'   : Largest-Triangle-Three-Buckets, garde la forme visuelle de la courbe
+# 'minmax' : minimum et maximum de chaque intervalle, garde tous les pics
+def downsample(x, y, max_points, mode='lttb'):
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if mode == 'none' or n <= max(max_points, 3):
+        return np.arange(n)
+    if mode == 'minmax':
+        buckets = np.arange(n) * max((max_points - 2) // 2, 1) // n
+        grouped = pd.Series(y).groupby(buckets)
+        return np.union1d(np.union1d(grouped.idxmin(), grouped.idxmax()), [0, n - 1])
+    if mode != 'lttb':
+        raise ValueError(f"unknown downsampling mode: {mode}")
+
+    # Les points intermédiaires sont répartis en max_points - 2 intervalles ; dans chacun on garde le point
+    # qui forme le plus grand triangle avec le point gardé précédemment et la moyenne de l'intervalle suivant.
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        keep[i + 1] = previous
+    return keep
+
+
+# --- BENCHMARK : python aggregations.py ---
+# Compare la version vectorisée aux lambdas utilisées auparavant dans app.py
+if __name__ == "__main__":
+    import sys
+    import time
+
+    rng = np.random.default_rng(0)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000  # Nombre de lignes, réduit par les tests
+    frame = pd.DataFrame({
+        'date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 60, n), unit='D'),
+        'group_name': rng.choice([f"Group {i}" for i in range(10)], n),
+        'agent': rng.choice([f"Agent {i}" for i in range(20)], n),
+        'occurrences': rng.integers(1, 30, n),
+        'mean_answer_time': rng.uniform(60, 90_000, n),
+        'sla_1st_response': rng.uniform(0, 100, n),
+        'perc_sla': rng.uniform(0, 100, n),
+    })
+    metrics = ['mean_answer_time', 'sla_1st_response', 'perc_sla']
+    by = ['date', 'group_name', 'agent']
+
+    def with_lambdas(df):
+        return df.groupby(by, as_index=False).agg({
+            'occurrences': 'sum',
+            **{
+                metric: lambda x: (x * df.loc[x.index, 'occurrences']).sum() / df.loc[x.index, 'occurrences'].sum()
+                for metric in metrics
+            },
+        })
+
+    for name, function in (('lambdas', with_lambdas), ('weighted_mean', lambda df: weighted_mean(df, by, metrics))):
+        started = time.perf_counter()
+        result = function(frame)
+        print(f"{name:>14}: {time.perf_counter() - started:.3f}s ({len(result)} groups)")
+
+    expected = with_lambdas(frame)
+    actual = weighted_mean(frame, by, metrics)
+    print("same results:", np.allclose(expected[metrics].to_numpy(), actual[metrics].to_numpy()))
+
+    # Moyennes par agent et groupe : à partir des lignes, ou à partir d'un résumé additif par jour calculé une fois
+    summary = pd.concat([frame[by], pd.DataFrame(additive_columns(frame, metrics), index=frame.index)], axis=1)
+    summary = summary.groupby(by, as_index=False, sort=True).sum()
+    for name, function in (
+        ('rows', lambda: weighted_mean(frame, ['agent', 'group_name'], metrics)),
+        ('roll_up', lambda: roll_up(summary, ['agent', 'group_name'], means=metrics)),
+    ):
+        started = time.perf_counter()
+        result = function()
+        print(f"{name:>14}: {time.perf_counter() - started:.3f}s ({len(result)} groups)")
+    print("same results:", np.allclose(
+        weighted_mean(frame, ['agent', 'group_name'], metrics)[metrics].to_numpy(),
+        roll_up(summary, ['agent', 'group_name'], means=metrics)[metrics].to_numpy(),
+    ))
+
+    # Formatage des durées : format_duration comparé aux quatre seconds_to_hms utilisés auparavant dans app.py
+    def hms_int(seconds):
+        if pd.isna(seconds):
+            return ""
+        seconds = int(seconds)
+        return f"{seconds // 3600:02}:{(seconds % 3600) // 60:02}:{seconds % 60:02}"
+
+    def hm_none(seconds):
+        if pd.isna(seconds):
+            return None
+        return f"{int(seconds // 3600):02}:{int((seconds % 3600) // 60):02}"
+
+    def hms_float(seconds):
+        if pd.isna(seconds):
+            return ""
+        return f"{int(seconds // 3600):02}:{int((seconds % 3600) // 60):02}:{int(seconds % 60):02}"
+
+    def hms_strftime(seconds):
+        return str(pd.to_datetime(seconds, unit='s').strftime('%H:%M:%S'))
+
+    durations = pd.Series(rng.uniform(0, 200_000, n))
+    durations[::50] = np.nan
+    print()
+    for name, function in (
+        ('hms (int)', lambda: durations.apply(hms_int)),
+        ('hm (None)', lambda: durations.apply(hm_none)),
+        ('hms (float)', lambda: durations.apply(hms_float)),
+        ('hms (strftime)', lambda: durations.dropna().apply(hms_strftime)),
+        ('format_duration', lambda: format_duration(durations.to_numpy())),
+        ('  (minutes)', lambda: format_duration(durations.to_numpy(), precision='minutes', missing=None)),
+    ):
+        started = time.perf_counter()
+        function()
+        print(f"{name:>15}: {time.perf_counter() - started:.3f}s")
+    print("same results:", (
+        format_duration(durations.to_numpy()).tolist() == durations.apply(hms_int).tolist()
+        and format_duration(durations.to_numpy(), precision='minutes', missing=None).tolist() == durations.apply(hm_none).tolist()
+    ))
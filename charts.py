@@ -0,0 +1,476 @@
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from aggregations import weighted_mean, slot_labels, downsample, format_duration
+from payloads import CHART_PAYLOAD_BUDGET, fit_budget, record_payload
+
+
+# Mémoïsation des graphiques : un graphique n'est reconstruit que si sa tranche de données change
+CHART_CACHE_TTL = int(st.secrets.get('CHART_CACHE_TTL', 600))
+CHART_CACHE_MAX_ENTRIES = int(st.secrets.get('CHART_CACHE_MAX_ENTRIES', 128))
+
+# --- REGISTRE DES GRAPHIQUES ---
+# nom -> fonction de construction. Rien n'est calculé à l'import : une fonction n'est appelée
+# qu'au moment où sa section est affichée, et son résultat est mémoïsé sur ses arguments.
+CHARTS = {}
+
+
+def chart(name):
+    def register(builder):
+        CHARTS[name] = builder
+        return builder
+    return register
+
+
+# Construction mémoïsée : la figure est mesurée (et réduite si elle dépasse le budget) une seule fois
+@st.cache_data(ttl=CHART_CACHE_TTL, max_entries=CHART_CACHE_MAX_ENTRIES, show_spinner=False)
+def _build(name, *args, **kwargs):
+    started = time.perf_counter()
+    fig = CHARTS[name](*args, **kwargs)
+    build_seconds = time.perf_counter() - started
+    fig, stats = fit_budget(fig)
+    stats['build_seconds'] = build_seconds
+    return fig, stats
+
+
+# Construire (ou relire du cache) puis afficher un graphique du registre
+def render(name, *args, key=None, **kwargs):
+    started = time.perf_counter()
+    fig, stats = _build(name, *args, **kwargs)
+    record_payload(name, stats, time.perf_counter() - started)
+    st.plotly_chart(fig, use_container_width=True, key=key)
+    if stats['over_budget']:
+        st.caption(f"⚠️ This chart sends {stats['bytes'] / 1e6:.1f} MB to the browser (budget {CHART_PAYLOAD_BUDGET / 1e6:.1f} MB)")
+
+
+# Graphique 1 : Tickets par groupe
+@chart('tickets_by_group')
+def tickets_by_group(df_filtered, color='rgb(6, 47, 104)'):
+    group_data = df_filtered.groupby('group_name', observed=True)['occurrences'].sum().reset_index()
+    group_data = group_data.sort_values(by='occurrences', ascending=False)  # Ordre décroissant
+
+    fig_group = px.bar(
+        group_data,
+        x='group_name',
+        y='occurrences',
+        title="🎟️ Tickets by Group",
+        text='occurrences'
+    )
+    fig_group.update_traces(
+        textposition='outside',
+        marker=dict(color=color)  # Couleur de l'équipe
+    )
+    fig_group.update_layout(
+        xaxis_title="Groups",
+        yaxis_title="Number of Tickets",
+        yaxis=dict(
+            autorange=True,  # Permet d'ajuster automatiquement les limites de l'axe Y
+            showgrid=True,
+            showline=True,
+            ticks='outside',
+            tickangle=45
+        ),
+        height=600,  # Ajuste la hauteur du graphique
+        margin=dict(l=50, r=50, t=50, b=100)  # Ajuste les marges pour les axes
+    )
+    return fig_group
+
+
+# --- Tickets par Agent et Groupe + total de l'équipe (ex. "Total Tadiplus") ---
+@chart('tickets_by_agent')
+def tickets_by_agent(df_filtered, df_team_total, total_label='Total Tadiplus', total_color='rgb(6, 47, 104)'):
+    df_team_total_group = df_team_total.groupby('group_name', observed=True)['occurrences'].sum().reset_index()
+
+    df_agents_group = df_filtered.groupby(['group_name', 'agent'], observed=True)['occurrences'].sum().reset_index()
+    df_agents_group = df_agents_group.sort_values(by='occurrences', ascending=False)  # Tri par ordre décroissant
+
+    # Créer une couleur pour chaque agent
+    color_map = {agent: px.colors.qualitative.Set1[i % len(px.colors.qualitative.Set1)] for i, agent in enumerate(df_agents_group['agent'].unique())}
+
+    # Ajouter le total de l'équipe dans le graphique
+    df_team_total_group['agent'] = total_label
+
+    # Fusionner le total de l'équipe avec les agents
+    df_combined = pd.concat([df_agents_group, df_team_total_group[['group_name', 'agent', 'occurrences']]])
+
+    # Forcer la couleur du total de l'équipe (par défaut rgb(6, 47, 104))
+    color_map[total_label] = total_color
+
+    # S'assurer que le total de l'équipe soit toujours en première position
+    df_combined['sort_order'] = df_combined['agent'].apply(lambda x: 0 if x == total_label else 1)
+    df_combined = df_combined.sort_values(by=['group_name', 'sort_order', 'occurrences'], ascending=[True, True, False])
+
+    # Triez les groupes en fonction des occurrences du total de l'équipe
+    team_total_order = df_team_total_group.sort_values(by='occurrences', ascending=False)['group_name'].tolist()
+    df_combined['group_name'] = pd.Categorical(df_combined['group_name'], categories=team_total_order, ordered=True)
+    df_combined = df_combined.sort_values('group_name')
+
+    fig_agent = px.bar(
+        df_combined,
+        x='group_name',
+        y='occurrences',
+        color='agent',
+        title=f"🎟️ Tickets by Agent and Group + {total_label}",
+        text='occurrences',
+        barmode='group',  # Barres groupées (Total vs agents)
+        color_discrete_map=color_map  # Appliquer la carte de couleurs
+    )
+    fig_agent.update_traces(textposition='outside')
+    fig_agent.update_layout(
+        xaxis_title="Groups",
+        yaxis_title="Number of Tickets",
+        yaxis=dict(
+            autorange=True,  # Permet d'ajuster automatiquement les limites de l'axe Y
+            showgrid=True,
+            showline=True,
+            ticks='outside',
+            tickangle=45
+        ),
+        height=600,  # Ajuste la hauteur du graphique
+        margin=dict(l=50, r=50, t=50, b=100)  # Ajuste les marges pour les axes
+    )
+    return fig_agent
+
+
+# Évolution des tickets (total par période, lu dans les cubes pré-agrégés)
+@chart('time_series')
+def time_series(df_time_series, x_column):
+    fig_time_series = px.line(
+        df_time_series,
+        x=x_column,
+        y="occurrences",
+        title="📈 Evolution of Tickets Over Time",
+        markers=True,  # Ajoute des points visibles
+        text="occurrences",  # Affiche les valeurs des points
+        line_shape="linear",  # Garde une courbe simple
+        color_discrete_sequence=["rgb(6, 47, 104)"]  # Améliore la lisibilité avec une couleur contrastée
+    )
+
+    # Améliorer la visibilité des données
+    fig_time_series.update_traces(
+        marker=dict(size=8, opacity=0.8, symbol="circle"),  # Points plus gros
+        line=dict(width=3),  # Épaissir la ligne
+        textposition="top center"  # Positionner les valeurs au-dessus des points
+    )
+
+    # Optimiser l'affichage des dates sur l'axe X
+    fig_time_series.update_layout(
+        xaxis_title="Time Period",
+        yaxis_title="Number of Tickets",
+        xaxis=dict(
+            tickangle=-45,  # Incliner les dates pour éviter le chevauchement
+            showgrid=True
+        ),
+        yaxis=dict(showgrid=True),
+        height=500,
+        margin=dict(l=50, r=50, t=50, b=100)
+    )
+    return fig_time_series
+
+
+# Courbe du total + barres empilées par `dimension` (groupe ou agent), par créneau horaire
+def _time_slot_figure(df_slots, value, dimension, title, yaxis_title):
+    # Grouper par 'time_slot' et dimension
+    df_grouped = df_slots.groupby(['time_slot', dimension], observed=True)[value].sum().reset_index()
+
+    # Ajouter une ligne pour les valeurs totales
+    df_total = df_slots.groupby('time_slot')[value].sum().reset_index()
+    df_total[dimension] = 'Total'  # On ajoute une colonne pour différencier
+
+    # Ajouter les totaux dans le dataset principal
+    df_grouped = pd.concat([df_grouped, df_total], ignore_index=True)
+
+    # 'time_slot' est en minutes depuis minuit (décalage horaire déjà appliqué au chargement) : tri chronologique direct
+    df_grouped = df_grouped.sort_values(by='time_slot', kind='stable')
+
+    # Libellés 'HH:MM' uniquement pour l'affichage, sur les lignes agrégées
+    df_grouped['time_slot'] = slot_labels(df_grouped['time_slot'])
+    ticks = df_grouped['time_slot'].dropna().unique()
+
+    # 🎨 Création du graphique combinant courbe + histogramme
+    fig = go.Figure()
+
+    # Ajouter d'abord la courbe pour le total
+    df_total_group = df_grouped[df_grouped[dimension] == 'Total']
+    fig.add_trace(go.Scatter(
+        x=df_total_group['time_slot'],
+        y=df_total_group[value],
+        mode='lines+markers+text',
+        text=df_total_group[value],
+        textposition='top center',  # Placer le texte au-dessus des points
+        name='Total',
+        line=dict(color="rgb(100, 120, 160)", width=4, dash='solid'),  # Couleur modifiée et épaisseur du trait augmentée
+        textfont=dict(color="rgb(100, 120, 160)"),  # Couleur du texte
+    ))
+
+    # Ajouter ensuite les barres pour chaque groupe / agent
+    for member in df_grouped[dimension].unique():
+        if member != "Total":
+            df_member = df_grouped[df_grouped[dimension] == member]
+            fig.add_trace(go.Bar(
+                x=df_member['time_slot'],
+                y=df_member[value],
+                name=f"{member}",
+                text=df_member[value],
+                textposition='inside',  # Position du texte à l'intérieur des barres pour éviter le chevauchement
+                textfont=dict(size=10),  # Taille de la police du texte
+            ))
+
+    # 🔹 Personnalisation du graphique
+    fig.update_layout(
+        title=title,
+        xaxis_title="Time Slot",
+        yaxis_title=yaxis_title,
+        barmode='stack',
+        height=500,
+        margin=dict(l=50, r=50, t=50, b=100),
+        xaxis=dict(
+            tickmode='array',  # Mode de tick personnalisé
+            tickvals=ticks,  # Un tick par créneau
+            ticktext=ticks  # Texte des ticks
+        ),
+        xaxis_tickangle=-45  # Inclinaison des labels en X pour lisibilité
+    )
+    return fig
+
+
+# Tickets créés par créneau horaire (v3_ticket_created_count)
+@chart('tickets_per_time_slot')
+def tickets_per_time_slot(df_filtered_tickets):
+    return _time_slot_figure(
+        df_filtered_tickets, 'ticket_count', 'group_name',
+        "🎟️ Tickets Created per Time Slot by Group", "Number of Tickets Created",
+    )
+
+
+# Actions des agents par créneau horaire (v3_agent_action_counts)
+@chart('agent_actions_per_time_slot')
+def agent_actions_per_time_slot(df_filtered_actions):
+    return _time_slot_figure(
+        df_filtered_actions, 'ticket_count', 'agent',
+        "🎯 Actions per Time Slot by Agent", "Number of Actions",
+    )
+
+
+# **Graphique pour les temps de réponse (mean_answer et mean_first_answer)**
+@chart('group_response_times')
+def group_response_times(df_filtered_group_kpis):
+    fig1 = go.Figure()
+
+    for group in df_filtered_group_kpis['group_name'].unique():
+        df_group = df_filtered_group_kpis[df_filtered_group_kpis['group_name'] == group]
+
+        # Mean Answer
+        fig1.add_trace(go.Bar(
+            x=[group],
+            y=df_group['mean_answer'],
+            name=f"Mean Answer - {group}",
+            text='<b>' + format_duration(df_group['mean_answer']) + '</b>',  # Labels en hh:mm:ss et en gras
+            textposition='inside',
+        ))
+
+        # Mean First Answer
+        fig1.add_trace(go.Bar(
+            x=[group],
+            y=df_group['mean_first_answer'],
+            name=f"Mean First Answer - {group}",
+            text='<b>' + format_duration(df_group['mean_first_answer']) + '</b>',  # Labels en hh:mm:ss et en gras
+            textposition='inside',
+        ))
+
+    fig1.update_layout(
+        title="Mean Answer & Mean First Answer by Group",
+        xaxis_title="Group",
+        yaxis_title="Time (in seconds)",  # Axe Y reste en secondes
+        barmode='group',
+        height=500,
+    )
+    return fig1
+
+
+# **Graphique pour les SLA (sla_1st_perc et sla_solution_perc)**
+@chart('group_sla')
+def group_sla(df_filtered_group_kpis):
+    fig2 = go.Figure()
+
+    for group in df_filtered_group_kpis['group_name'].unique():
+        df_group = df_filtered_group_kpis[df_filtered_group_kpis['group_name'] == group]
+
+        # SLA 1st Percent
+        fig2.add_trace(go.Bar(
+            x=[group],
+            y=df_group['sla_1st_perc'],
+            name=f"SLA 1st Response % - {group}",
+            text=[f"<b>{int(x)}%</b>" for x in df_group['sla_1st_perc']],  # Labels en gras et sans virgule
+            textposition='inside',
+        ))
+
+        # SLA Solution Percent
+        fig2.add_trace(go.Bar(
+            x=[group],
+            y=df_group['sla_solution_perc'],
+            name=f"SLA Solution % - {group}",
+            text=[f"<b>{int(x)}%</b>" for x in df_group['sla_solution_perc']],  # Labels en gras et sans virgule
+            textposition='inside',
+        ))
+
+    fig2.update_layout(
+        title="SLA 1st Response % & SLA Solution % by Group",
+        xaxis_title="Group",
+        yaxis_title="Percentage",
+        barmode='group',
+        height=500,
+    )
+    return fig2
+
+
+# --- HEATMAP AGENT x GROUPE (composant partagé par les trois heatmaps) ---
+# Une seule trace go.Heatmap : la table pivot est lue une fois en tableau numpy, les libellés des cases
+# sont produits en une passe (`labels`, sinon `texttemplate` sur z) et affichés par le texttemplate de la trace,
+# sans annotation par case. Plotly choisit lui-même une couleur de texte lisible sur la couleur de chaque case.
+# image=True : premier agent en haut et cases carrées (présentation de px.imshow).
+def heatmap(df, value_col, title, colorscale, labels=None, texttemplate="%{z:.1f}", height=600, image=False):
+    df_pivot = df.pivot_table(index="agent", columns="group_name", values=value_col, aggfunc="mean", observed=True)
+    z = df_pivot.to_numpy(dtype='float64')
+    x = df_pivot.columns.astype(str).tolist()
+    y = df_pivot.index.astype(str).tolist()
+
+    fig = go.Figure(data=go.Heatmap(
+        z=z,
+        x=x,
+        y=y,
+        colorscale=colorscale,
+        text=None if labels is None else labels(z),
+        texttemplate=texttemplate if labels is None else "%{text}",
+        hovertemplate=f"Group: %{{x}}<br>Agent: %{{y}}<br>{value_col}: " + ("%{z}" if labels is None else "%{text}") + "<extra></extra>",
+        colorbar=dict(title=value_col),
+        showscale=True
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Groups",
+        yaxis_title="Agents",
+        height=height,
+    )
+    if image:
+        fig.update_xaxes(constrain='domain', scaleanchor='y')
+        fig.update_yaxes(constrain='domain', autorange='reversed')
+    return fig
+
+
+# --- HEATMAP DU TEMPS DE RÉPONSE MOYEN ---
+@chart('response_time_heatmap')
+def response_time_heatmap(df_tadiplus):
+    return heatmap(
+        df_tadiplus,
+        "mean_answer_time",
+        "⏳ Heatmap of Average Response Time by Agent and Group",
+        "RdYlBu_r",  # Rouge = mauvais, Bleu = bon
+        labels=format_duration,  # Affichage en HH:MM:SS
+        height=500,
+    )
+
+
+# --- HEATMAP D'UNE MÉTRIQUE SLA PAR AGENT ET GROUPE ---
+@chart('sla_heatmap')
+def sla_heatmap(df, value_col, title, colorscale):
+    return heatmap(df, value_col, title, colorscale, texttemplate="%{z:.1f}", image=True)  # Valeurs avec 1 décimale
+
+
+# Métrique choisie -> (colonne, libellé)
+METRICS = {
+    "Mean Answer Time": ("mean_answer_time", "Mean Answer Time"),
+    "SLA 1st Response": ("sla_1st_response", "SLA 1st Response"),
+    "Percentage SLA": ("perc_sla", "Percentage SLA"),
+}
+
+# Taille du graphique "Compare Metrics Across Groups", bornée quelle que soit la période
+METRIC_MAX_POINTS = int(st.secrets.get('METRIC_MAX_POINTS', 500))  # Points max par courbe (au-delà : réduction côté serveur)
+METRIC_DOWNSAMPLING = st.secrets.get('METRIC_DOWNSAMPLING', 'lttb')  # 'lttb', 'minmax' ou 'none'
+METRIC_MAX_ANNOTATIONS = int(st.secrets.get('METRIC_MAX_ANNOTATIONS', 20))  # Seuls les extrêmes sont annotés
+
+
+# Libellés d'un tableau de valeurs, formatés en une passe (HH:MM:SS pour les durées, "12.3%" sinon)
+def metric_labels(values, metric_col):
+    if metric_col == 'mean_answer_time':
+        return format_duration(values)
+    return np.char.mod('%.1f%%', values).astype(object)
+
+
+# --- ÉVOLUTION D'UNE MÉTRIQUE PAR GROUPE ET AGENT AU FIL DU TEMPS ---
+# Une courbe par (groupe, agent), découpée dans des tableaux triés une seule fois (pas d'iterrows) ;
+# chaque courbe est réduite à METRIC_MAX_POINTS points, et seuls les maxima / minima des courbes sont annotés.
+@chart('metric_over_time')
+def metric_over_time(df_sla_answer, metric_option):
+    # --- CALCUL DES MOYENNES PONDÉRÉES PAR DATE, GROUPE ET AGENT ---
+    df_grouped = weighted_mean(
+        df_sla_answer, ['date', 'group_name', 'agent'], ['mean_answer_time', 'sla_1st_response', 'perc_sla']
+    )
+    metric_col, metric_label = METRICS[metric_option]
+
+    # Courbes ordonnées par groupe puis agent (ordre d'apparition), puis tri stable :
+    # chaque courbe devient une tranche contiguë des tableaux, déjà triée par date
+    pair_id = df_grouped.groupby(['group_name', 'agent'], observed=True, sort=False).ngroup().to_numpy()
+    group_rank = pd.factorize(df_grouped['group_name'])[0]
+    series_id = group_rank * (pair_id.max(initial=0) + 1) + pair_id
+    order = np.argsort(series_id, kind='stable')
+    series_id = series_id[order]
+    dates = df_grouped['date'].to_numpy()[order]
+    values = df_grouped[metric_col].to_numpy(dtype='float64')[order]
+    groups = df_grouped['group_name'].to_numpy()[order]
+    agents = df_grouped['agent'].to_numpy()[order]
+    labels = metric_labels(values, metric_col)
+
+    bounds = np.flatnonzero(np.diff(series_id)) + 1
+    starts = np.r_[0, bounds] if len(order) else np.array([], dtype=int)
+    ends = np.r_[bounds, len(order)] if len(order) else np.array([], dtype=int)
+
+    fig = go.Figure()
+    for start, end in zip(starts, ends):
+        keep = start + downsample(dates[start:end].astype('int64'), values[start:end], METRIC_MAX_POINTS, METRIC_DOWNSAMPLING)
+        fig.add_trace(go.Scatter(
+            x=dates[keep],
+            y=values[keep],
+            mode='lines+markers',
+            name=f"{groups[start]} - {agents[start]} - {metric_label}",
+            text=labels[keep],
+            textposition='top center',
+            line=dict(width=2)
+        ))
+
+    # --- ANNOTATIONS : maximum et minimum de chaque courbe, puis les plus extrêmes jusqu'à METRIC_MAX_ANNOTATIONS ---
+    valid = pd.Series(values).dropna()
+    by_series = valid.groupby(series_id[valid.index])
+    maxima = valid[by_series.idxmax().to_numpy()].sort_values(ascending=False).index[:METRIC_MAX_ANNOTATIONS - METRIC_MAX_ANNOTATIONS // 2]
+    minima = valid[by_series.idxmin().to_numpy()].drop(maxima, errors='ignore').sort_values().index[:METRIC_MAX_ANNOTATIONS // 2]
+    fig.update_layout(annotations=[
+        dict(
+            x=pd.Timestamp(dates[i]),
+            y=values[i],
+            text=f"{agents[i]}: {labels[i]}",
+            showarrow=True,
+            arrowhead=2,
+            ax=0,
+            ay=-50,
+            font=dict(size=10, color="black"),
+            bgcolor="white",
+            opacity=0.7
+        )
+        for i in maxima.append(minima)
+    ])
+
+    # Personnalisation du graphique
+    fig.update_layout(
+        title=f"{metric_label} over Time by Group with Agent Values",
+        xaxis_title="Date",
+        yaxis_title="Values",
+        height=600,
+        showlegend=True,
+    )
+    return fig
@@ -0,0 +1,630 @@
+import threading
+import time
+from datetime import date, timedelta
+from collections import OrderedDict
+from concurrent import futures
+
+import pandas as pd
+import streamlit as st
+
+from queries import (
+    QUERY_DISTRIBUTION, QUERY_TICKETS_CREATED, QUERY_AGENT_ACTIONS, QUERY_GROUP_KPIS, QUERY_TADIPLUS,
+    filtered_query, to_statement, aggregate_query,
+)
+from snapshots import snapshot_id, save_snapshot, load_snapshot
+from rollups import Rollups, agent_summary
+from schema import apply_schema, concat_typed, sort_by_date, date_slice
+from db import connection
+
+# Copy-on-write : une sélection de colonnes ou une vue d'une table partagée ne recopie pas ses données ;
+# une copie n'est faite que si quelqu'un modifie la vue (ce que le dashboard ne fait jamais)
+pd.set_option('mode.copy_on_write', True)
+
+# Paramètres du cache des tables (partagé par toutes les sessions du process)
+CACHE_TTL = int(st.secrets.get('CACHE_TTL', 600))  # Durée de vie d'un résultat en secondes
+# Intervalle de rafraîchissement propre à chaque table source (secondes, défaut CACHE_TTL),
+# ex. dans secrets.toml :  [REFRESH_INTERVALS]  distribution = 300  group_kpis = 1800
+REFRESH_INTERVALS = st.secrets.get('REFRESH_INTERVALS', {})
+# Planificateur : tables examinées toutes les SCHEDULER_TICK secondes ; une table que personne n'a affichée
+# depuis SCHEDULER_IDLE secondes n'est plus rafraîchie (elle le sera en arrière-plan à son prochain affichage)
+SCHEDULER_TICK = float(st.secrets.get('SCHEDULER_TICK', 15))
+SCHEDULER_IDLE = float(st.secrets.get('SCHEDULER_IDLE', 3600))
+CACHE_MAX_ENTRIES = int(st.secrets.get('CACHE_MAX_ENTRIES', 64))  # Au-delà : éviction LRU
+# Plafond mémoire du cache (Mo, 0 = pas de plafond) : au-delà, les partitions (une par équipe) utilisées
+# le moins récemment sont retirées en entier ; la partition affichée n'est jamais retirée
+CACHE_MAX_MB = float(st.secrets.get('CACHE_MAX_MB', 0))
+# Nombre de jours relus avant le dernier jour chargé (les agrégats d'hier peuvent encore bouger)
+REFRESH_LOOKBACK_DAYS = int(st.secrets.get('REFRESH_LOOKBACK_DAYS', 1))
+# Décalage horaire appliqué une fois au chargement des time_slot (heure de la base -> heure affichée)
+TIME_SLOT_OFFSET_HOURS = float(st.secrets.get('TIME_SLOT_OFFSET_HOURS', 1))
+# Délai avant de retenter MySQL après un échec (les données du snapshot restent servies)
+REFRESH_RETRY = int(st.secrets.get('REFRESH_RETRY', 60))
+# Mode hors-ligne : uniquement les snapshots locaux, aucune requête MySQL (tests, maintenance de la base)
+SNAPSHOT_ONLY = bool(st.secrets.get('SNAPSHOT_ONLY', False))
+# Lecture en flux des tables de faits : curseur côté serveur, STREAM_CHUNK_ROWS lignes à la fois, typées au fil de l'eau
+STREAM_CHUNK_ROWS = int(st.secrets.get('STREAM_CHUNK_ROWS', 50_000))
+# Plafond mémoire d'une table en cours de chargement (Mo, 0 = pas de plafond) : au-delà, le chargement est abandonné
+# (premier chargement de l'historique : seule la période affichée est alors chargée, voir load_dataset)
+STREAM_MEMORY_LIMIT_MB = float(st.secrets.get('STREAM_MEMORY_LIMIT_MB', 1024))
+# Historique gardé en mémoire (jours avant aujourd'hui) : changer de période à l'intérieur de cette fenêtre
+# ne relance aucune requête, la période est découpée dans les tables déjà chargées
+HISTORY_DAYS = int(st.secrets.get('HISTORY_DAYS', 90))
+# Requêtes lancées en parallèle (au plus DB_POOL_SIZE + DB_MAX_OVERFLOW connexions utiles)
+LOAD_WORKERS = int(st.secrets.get('LOAD_WORKERS', 6))
+# Attente max d'une table (secondes) ; au-delà, la version en cache est servie et la requête continue en arrière-plan
+# (sans version en cache, la table est attendue)
+QUERY_TIMEOUT = float(st.secrets.get('QUERY_TIMEOUT', 30))
+# Où sont calculés les regroupements des graphiques :
+# 'memory' : tables de faits chargées en entier, regroupées par pandas (filtres instantanés une fois chargé)
+# 'sql'    : MySQL fait les GROUP BY (queries.AGGREGATES), seules les lignes agrégées sont transférées
+AGGREGATION_MODE = st.secrets.get('AGGREGATION_MODE', 'memory')
+
+# Pool de chargement partagé par toutes les sessions : les tables sources sont indépendantes,
+# la latence d'une page devient celle de la requête la plus lente au lieu de la somme de toutes
+_executor = futures.ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix='load')
+
+# --- TABLES SOURCES ---
+# nom -> (requête, alias SQL, filtre par agent ?)
+# Chaque table n'est lue qu'une seule fois par rafraîchissement, quel que soit le nombre de graphiques qui l'utilisent.
+TABLES = {
+    'distribution': (QUERY_DISTRIBUTION, 'd', True),
+    'tadiplus': (QUERY_TADIPLUS, 't', True),
+    'tickets_created': (QUERY_TICKETS_CREATED, 't', False),
+    'agent_actions': (QUERY_AGENT_ACTIONS, 't', True),
+    'group_kpis': (QUERY_GROUP_KPIS, 'gk', False),
+}
+
+# Colonnes de v3_tadiplus_tickets_distri ajoutées à la distribution (ancienne jointure SQL)
+JOIN_KEYS = ['date', 'group_id', 'agent_id']
+TADIPLUS_JOIN_COLUMNS = [
+    'sum_first_time_reply', 'mean_first_time_reply', 'sum_answer_time', 'mean_answer_time',
+    'sla_1st_response', 'perc_sla',
+]
+
+
+class MemoryLimitExceeded(RuntimeError):
+    pass
+
+
+# --- TABLE EN CACHE ---
+# Une table chargée depuis MySQL, gardée en mémoire pour toutes les sessions et recopiée dans un snapshot Parquet.
+# Stale-while-revalidate : dès qu'une version existe (en mémoire ou en snapshot), elle est servie tout de suite
+# et les rafraîchissements se font en arrière-plan, la nouvelle version remplaçant l'ancienne d'un bloc.
+# Si MySQL est indisponible, la dernière version connue reste servie.
+class CachedTable:
+    def __init__(self, name, engine, key, interval=CACHE_TTL):
+        self.name = name
+        self.engine = engine
+        self.snapshot = snapshot_id(name, key)
+        self.interval = interval  # Secondes avant qu'une version soit considérée périmée
+        self.used_at = time.time()  # Dernier affichage (le planificateur ignore les tables oubliées)
+
+        self.frame = None
+        self.watermark = None
+        self.loaded_at = None
+        self.failed_at = None
+        self.stale = True
+        self.refreshing = False
+        self.future = None
+        self.progress = None  # Lignes déjà reçues par le chargement en cours
+        self.last_refresh = {}
+        self.derived = {}
+        self.partitions = set()  # Équipes qui utilisent cette table (None : table commune, ex. dimensions)
+        self.lock = threading.Lock()
+        self.submit_lock = threading.Lock()
+
+    # `since` : première date modifiée lors d'un rafraîchissement incrémental (None = tout a changé)
+    # Seules les structures incrémentales dérivées de cette seule table, et de sa version courante, sont mises à jour ;
+    # les autres (construites sur une version antérieure, ou sur plusieurs tables) seront recalculées au prochain derive().
+    def _set(self, frame, mode, fetched, since=None):
+        derived = {}
+        if since is not None:
+            for name, (sources, value, incremental) in self.derived.items():
+                if incremental and len(sources) == 1 and sources[0] is self.frame:
+                    value.update(frame, since)
+                    derived[name] = ((frame,), value, incremental)
+        self.derived = derived
+        self.frame = frame
+        self.watermark = frame['date'].max() if 'date' in frame and len(frame) else None
+        self.loaded_at = time.time()
+        self.failed_at = None
+        self.stale = False
+        self.last_refresh = {'mode': mode, 'rows_fetched': fetched, 'at': pd.Timestamp.now()}
+        save_snapshot(self.snapshot, frame, self.watermark, self.loaded_at)
+
+    def restore(self):
+        frame, entry = load_snapshot(self.snapshot)
+        if frame is None:
+            return False
+        self.frame = sort_by_date(frame) if 'date' in frame else frame  # Snapshot d'une version antérieure non triée
+        self.watermark = entry['watermark']
+        self.loaded_at = entry['loaded_at']
+        self.last_refresh = {'mode': 'snapshot', 'rows_fetched': 0, 'at': pd.Timestamp(entry['loaded_at'], unit='s')}
+        return True
+
+    def needs_refresh(self):
+        if SNAPSHOT_ONLY or self.refreshing:
+            return False
+        if self.frame is None:
+            return True
+        if self.failed_at is not None and time.time() - self.failed_at < REFRESH_RETRY:
+            return False
+        return self.stale or time.time() - self.loaded_at > self.interval
+
+    def refresh(self, full=False):
+        with self.lock:
+            self.refreshing = True
+            try:
+                self._refresh(full)
+            except Exception as error:
+                if self.frame is None:
+                    raise
+                # Base indisponible : on continue à servir la dernière version connue
+                self.failed_at = time.time()
+                self.last_refresh = {'mode': 'failed', 'rows_fetched': 0, 'at': pd.Timestamp.now(), 'error': str(error)}
+            finally:
+                self.refreshing = False
+
+    # Structure calculée à partir de la table (ex. cubes d'agrégats), reconstruite seulement quand les données changent.
+    # `others` : autres tables lues par `factory` (jointure) ; la structure est recalculée si l'une d'elles a changé.
+    # Partagée par toutes les sessions : chaque rerun réutilise le même objet au lieu d'en refaire une copie.
+    # incremental=True : la structure a une méthode update(frame, since) appelée à chaque rafraîchissement incrémental.
+    def derive(self, name, factory, *others, incremental=False):
+        frames = (self.frame,) + tuple(table.frame for table in others)
+        sources, value, _ = self.derived.get(name, ((), None, incremental))
+        if len(sources) != len(frames) or any(a is not b for a, b in zip(sources, frames)):
+            value = factory(*frames)
+            self.derived[name] = (frames, value, incremental)
+        return value
+
+    # Rafraîchissement lancé dans le pool de chargement ; un seul à la fois par table, partagé entre les sessions
+    def submit(self):
+        with self.submit_lock:
+            if self.future is None or self.future.done():
+                self.refreshing = True
+                self.future = _executor.submit(self.refresh)
+                self.future.add_done_callback(self._on_done)
+            return self.future
+
+    # Annulé avant d'avoir démarré : la table n'est plus en cours de rafraîchissement
+    def _on_done(self, future):
+        if future.cancelled():
+            self.refreshing = False
+
+    def refresh_in_background(self):
+        self.submit()
+
+    # Démarrer ce qu'il faut pour disposer des données ; retourne le chargement à attendre (ou None).
+    # Seul un tout premier chargement (ni version en mémoire, ni snapshot) fait attendre l'utilisateur.
+    def start_loading(self):
+        if self.frame is None and self.restore():
+            if not SNAPSHOT_ONLY:
+                self.submit()
+            return None
+        if self.frame is not None:
+            if self.needs_refresh():
+                self.submit()  # Version périmée servie pendant le rafraîchissement
+            return None
+        if self.needs_refresh():
+            return self.submit()
+        if self.refreshing:
+            return self.future  # Premier chargement déjà lancé par une autre session
+        return None
+
+    # Garantir qu'une version des données est disponible, en bloquant le moins possible
+    def ensure_loaded(self):
+        return load_tables({self.name: self})[self.name]
+
+
+def _loading_label(name, table):
+    rows = table.progress
+    return f"{name} ({rows:,} rows)" if rows else name
+
+
+# --- CHARGEMENT PARALLÈLE ---
+# Toutes les requêtes nécessaires partent en même temps ; on attend au plus QUERY_TIMEOUT secondes.
+# Une table qui n'a pas répondu à temps est servie depuis sa version en cache (la requête continue en arrière-plan) ;
+# une table sans aucune version (premier chargement, pas de snapshot) est attendue jusqu'au bout.
+# L'attente se fait par petits pas en mettant à jour la barre de progression : si l'utilisateur change un filtre,
+# Streamlit interrompt le script à cette mise à jour et les requêtes pas encore démarrées sont annulées.
+def load_tables(tables):
+    pending = {}
+    for name, table in tables.items():
+        future = table.start_loading()
+        if future is not None:
+            pending[name] = future
+    remaining = list(pending)
+    timed_out = []
+    if pending:
+        started = time.perf_counter()
+        progress = st.progress(0.0)
+        try:
+            while remaining:
+                if time.perf_counter() - started >= QUERY_TIMEOUT:
+                    timed_out += [name for name in remaining if tables[name].frame is not None]
+                    remaining = [name for name in remaining if name not in timed_out]
+                    if not remaining:
+                        break
+                progress.progress(
+                    1 - len(remaining) / len(pending),
+                    text=f"Loading {', '.join(_loading_label(name, tables[name]) for name in remaining)}... "
+                    f"({time.perf_counter() - started:.1f}s)",
+                )
+                futures.wait([pending[name] for name in remaining], timeout=0.25, return_when=futures.FIRST_COMPLETED)
+                for name in remaining:
+                    if pending[name].cancelled():
+                        pending[name] = tables[name].submit()  # Annulé par une autre session qui n'en avait plus besoin
+                remaining = [name for name in remaining if not pending[name].done()]
+        except BaseException:
+            for future in pending.values():
+                future.cancel()
+            raise
+        finally:
+            progress.empty()
+
+    frames = {}
+    for name, table in tables.items():
+        if name in timed_out:
+            table.last_refresh = dict(table.last_refresh, mode='timeout (cached copy)')
+        elif name in pending and not pending[name].cancelled() and pending[name].exception() is not None and table.frame is None:
+            raise pending[name].exception()
+        if table.frame is None:
+            raise RuntimeError(f"No data available for {name}")
+        frames[name] = table.frame
+    return frames
+
+
+# Petite table de dimension (agents, groupes) : toujours relue en entier
+class DimensionTable(CachedTable):
+    def __init__(self, name, engine, query, params):
+        super().__init__(name, engine, (query, params))
+        self.query = query
+        self.params = params
+
+    def _refresh(self, full=False):
+        with connection(self.engine) as conn:
+            frame = pd.read_sql(to_statement(self.query, self.params), conn, params=self.params)
+        self._set(frame, 'full', len(frame))
+
+
+# --- CHARGEMENT INCRÉMENTAL D'UNE TABLE ---
+# Les tables v3_* sont des agrégats journaliers : seuls les derniers jours changent.
+# On garde en mémoire le dernier jour chargé ("watermark") et on ne relit que
+# date >= watermark - REFRESH_LOOKBACK_DAYS, puis on remplace ces jours par les lignes relues.
+class IncrementalTable(CachedTable):
+    def __init__(self, name, engine, start, end, group_ids, agent_ids):
+        self.query, self.alias, by_agent = TABLES[name]
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.filters = dict(group_ids=group_ids)
+        if by_agent:
+            self.filters['agent_ids'] = agent_ids
+        super().__init__(name, engine, (start, end, group_ids, self.filters.get('agent_ids')), refresh_interval(name))
+
+    # Lecture en flux : le résultat n'est jamais entièrement en mémoire sous forme brute (tuples, chaînes) ;
+    # chaque morceau reçoit tout de suite ses types déclarés (schema.py), bien plus compacts, avant le suivant.
+    def _fetch(self, since):
+        sql, params = filtered_query(self.query, self.alias, start=since.date(), end=self.end.date(), **self.filters)
+        offset = int(TIME_SLOT_OFFSET_HOURS * 60)
+        limit = STREAM_MEMORY_LIMIT_MB * 1e6
+        chunks = []
+        size = 0
+        self.progress = 0
+        try:
+            with connection(self.engine) as conn:
+                conn = conn.execution_options(stream_results=True)  # pymysql : SSCursor, lignes lues au fur et à mesure
+                for chunk in pd.read_sql(to_statement(sql, params), conn, params=params, chunksize=STREAM_CHUNK_ROWS):
+                    chunk = apply_schema(chunk, self.name, offset)
+                    chunks.append(chunk)
+                    size += int(chunk.memory_usage(deep=True).sum())
+                    self.progress += len(chunk)
+                    if limit and size > limit:
+                        raise MemoryLimitExceeded(
+                            f"{self.name}: more than {STREAM_MEMORY_LIMIT_MB:g} MB after {self.progress:,} rows, "
+                            "narrow the date range or raise STREAM_MEMORY_LIMIT_MB"
+                        )
+        finally:
+            self.progress = None
+        return sort_by_date(concat_typed(chunks))
+
+    def _refresh(self, full=False):
+        if full or self.frame is None or self.watermark is None:
+            frame = self._fetch(self.start)
+            self._set(frame, 'full', len(frame))
+            return
+
+        lookback = pd.Timedelta(days=REFRESH_LOOKBACK_DAYS)
+        if self.end < pd.Timestamp.today().normalize() - lookback:
+            # Période entièrement dans le passé et déjà chargée : ces agrégats ne bougent plus
+            self.loaded_at = time.time()
+            self.stale = False
+            self.last_refresh = {'mode': 'skipped', 'rows_fetched': 0, 'at': pd.Timestamp.now()}
+            return
+
+        since = max(self.watermark - lookback, self.start)
+
+        # Colonnes toujours celles du schéma déclaré (schema.py) : une table modifiée côté base lève SchemaError,
+        # le rafraîchissement échoue et la dernière version reste servie
+        delta = self._fetch(since)
+
+        # La fenêtre relue remplace entièrement l'ancienne : une ligne disparue (changement de groupe,
+        # d'agent) ne reste pas en mémoire. Les deux morceaux sont triés, le résultat aussi.
+        frame = concat_typed([self.frame[self.frame['date'] < since], delta])
+        self._set(frame, 'incremental', 0 if delta is None else len(delta), since=since)
+
+
+# --- AGRÉGAT CALCULÉ PAR MYSQL (AGGREGATION_MODE = 'sql') ---
+# Quelques lignes par graphique : toujours relu en entier, mis en cache et en snapshot comme une table.
+class AggregateTable(CachedTable):
+    def __init__(self, name, engine, spec, filters):
+        super().__init__(name, engine, (repr(spec), filters), refresh_interval(spec['table']))
+        self.spec = spec
+        self.filters = filters
+
+    def _refresh(self, full=False):
+        sql, params = aggregate_query(self.spec, **self.filters)
+        with connection(self.engine) as conn:
+            frame = pd.read_sql(to_statement(sql, params), conn, params=params)
+        frame = apply_schema(frame, self.spec['table'], int(TIME_SLOT_OFFSET_HOURS * 60), partial=True)
+        self._set(frame, 'aggregate', len(frame))
+
+
+# Registre des tables chargées, partagé par toutes les sessions (éviction LRU au-delà de CACHE_MAX_ENTRIES)
+_tables = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def _register(key, factory, partition=None):
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is None:
+            table = factory()
+            _tables[key] = table
+        table.partitions.add(partition)
+        table.used_at = time.time()
+        _tables.move_to_end(key)
+        while len(_tables) > CACHE_MAX_ENTRIES:
+            _tables.popitem(last=False)
+    return table
+
+
+def refresh_interval(name):
+    return float(REFRESH_INTERVALS.get(name, CACHE_TTL))
+
+
+def get_table(engine, name, start, end, group_ids, agent_ids, partition=None):
+    key = (name, start, end, group_ids, agent_ids if TABLES[name][2] else None)
+    return _register(key, lambda: IncrementalTable(name, engine, start, end, group_ids, agent_ids), partition)
+
+
+# Mémoire d'une table en cache et des structures qui en sont dérivées (jointure, résumé)
+def _table_bytes(table):
+    frames = [table.frame] + [value for _, value, _ in table.derived.values() if isinstance(value, pd.DataFrame)]
+    return sum(int(frame.memory_usage(deep=True).sum()) for frame in frames if frame is not None)
+
+
+# --- PARTITIONS PAR ÉQUIPE ---
+# Chaque équipe a ses propres tables (filtrées sur ses agent_id), chargées seulement quand elle est affichée.
+# Au-delà de CACHE_MAX_MB, les partitions sont retirées de la moins récemment utilisée à la plus récente ;
+# une table partagée avec la partition affichée (ex. tickets créés par groupe) est gardée.
+def _evict(keep):
+    if not CACHE_MAX_MB:
+        return
+    with _tables_lock:
+        sizes = {key: _table_bytes(table) for key, table in _tables.items()}
+        total = sum(sizes.values())
+        evicted = set()
+        # Ordre du registre LRU : la première apparition d'une partition est son utilisation la plus ancienne
+        for partition in dict.fromkeys(p for table in _tables.values() for p in table.partitions):
+            if total <= CACHE_MAX_MB * 1e6:
+                break
+            if partition in (keep, None):
+                continue
+            evicted.add(partition)
+            for key in [key for key, table in _tables.items() if table.partitions <= evicted]:
+                total -= sizes.pop(key)
+                del _tables[key]
+
+
+# Mémoire du cache par partition (une table commune à plusieurs équipes est comptée dans chacune)
+def cache_report():
+    with _tables_lock:
+        tables = list(_tables.values())
+    rows = [
+        {'partition': partition or '(shared)', 'tables': 1, 'bytes': _table_bytes(table)}
+        for table in tables for partition in table.partitions
+    ]
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).groupby('partition', as_index=False).sum().sort_values('bytes', ascending=False, ignore_index=True)
+
+
+# Agrégats demandés par les graphiques : nom -> (spec de queries.AGGREGATES, filtres), requêtes en parallèle.
+# Retourne (nom -> DataFrame, fraîcheur : voir freshness)
+def load_aggregates(engine, requests, partition=None):
+    tables = {}
+    for name, (spec, filters) in requests.items():
+        filters = dict(filters)
+        key = ('aggregate', name, repr(spec), tuple(sorted(filters.items())))
+        tables[name] = _register(key, lambda: AggregateTable(name, engine, spec, filters), partition)
+    frames = load_tables(tables)
+    _evict(keep=partition)
+    return frames, freshness(tables.values())
+
+
+# Fraîcheur des données affichées : chargement le plus ancien (pd.Timestamp local) et rafraîchissement en cours ?
+def freshness(tables):
+    tables = list(tables)
+    loaded = [table.loaded_at for table in tables if table.loaded_at is not None]
+    as_of = pd.Timestamp.fromtimestamp(min(loaded)) if loaded else None
+    return as_of, any(table.refreshing for table in tables)
+
+
+# --- PLANIFICATEUR DE RAFRAÎCHISSEMENT ---
+# Un thread par process : chaque table affichée récemment est rafraîchie en arrière-plan dès que son intervalle
+# (REFRESH_INTERVALS) est écoulé, sans attendre qu'un utilisateur relance la page.
+def _schedule():
+    while True:
+        time.sleep(SCHEDULER_TICK)
+        with _tables_lock:
+            tables = list(_tables.values())
+        for table in tables:
+            try:
+                if table.frame is not None and time.time() - table.used_at < SCHEDULER_IDLE and table.needs_refresh():
+                    table.submit()
+            except Exception:
+                pass  # Un échec est déjà noté par la table (failed_at) ; le planificateur continue
+
+
+@st.cache_resource(show_spinner=False)
+def start_scheduler():
+    thread = threading.Thread(target=_schedule, name='refresh-scheduler', daemon=True)
+    thread.start()
+    return thread
+
+
+# Résultat d'une requête de dimension (liste des agents, des groupes), mis en cache comme les tables
+def load_dimension(engine, name, query, params=None):
+    key = (name, query, repr(params))
+    return _register(key, lambda: DimensionTable(name, engine, query, params)).ensure_loaded()
+
+
+# Bouton "Refresh Data" : demande un rafraîchissement (incrémental) de toutes les tables en mémoire
+def clear_cache(full=False):
+    with _tables_lock:
+        if full:
+            _tables.clear()
+        for table in _tables.values():
+            table.stale = True
+            table.failed_at = None
+
+
+# --- JEU DE DONNÉES PARTAGÉ ---
+# Contient une DataFrame par table source. Les graphiques demandent une vue limitée aux colonnes
+# dont ils ont besoin ; chaque vue est comptabilisée pour mesurer ce que le partage évite de recharger.
+class Dataset:
+    def __init__(self, tables, period=None):
+        self.tables = tables
+        self.period = period  # (début, fin) retenus par view() ; les tables couvrent tout l'historique chargé
+        self.views = {name: [] for name in tables}
+        self.slices = []  # (lignes, octets) des tranches filtrées par cette session
+        self.status = pd.DataFrame()
+        self.as_of = None  # Chargement le plus ancien des tables sources
+        self.refreshing = False  # Un rafraîchissement est en cours en arrière-plan
+
+    # `charts` : nombre de graphiques alimentés par cette vue (chacun faisait sa propre requête avant le partage)
+    def view(self, name, columns=None, charts=1):
+        frame = self.tables[name]
+        if self.period is not None:
+            frame = date_slice(frame, *self.period)
+        if columns is not None:
+            frame = frame[list(columns)]
+        self.views[name].append((charts, len(frame), int(frame.memory_usage(deep=True).sum())))
+        return frame
+
+    # Lignes retenues par un filtre de la session : c'est la seule copie propre à la session
+    # (les tables et les sélections de colonnes restent partagées grâce au copy-on-write)
+    def filter(self, frame, mask):
+        frame = frame[mask]
+        self.slices.append((len(frame), int(frame.memory_usage(deep=True).sum())))
+        return frame
+
+    # Mémoire des tables partagées par toutes les sessions du process, puis celle des tranches de cette session
+    def memory_report(self):
+        rows = [
+            {'scope': 'shared', 'data': name, 'rows': len(frame), 'bytes': int(frame.memory_usage(deep=True).sum())}
+            for name, frame in self.tables.items()
+        ]
+        rows.append({
+            'scope': 'this session', 'data': f"{len(self.slices)} filtered slices",
+            'rows': sum(r for r, _ in self.slices), 'bytes': sum(b for _, b in self.slices),
+        })
+        return pd.DataFrame(rows)
+
+    # Sans partage, chaque graphique aurait relu la période par sa propre requête (et sa propre DataFrame) :
+    # tout ce qui dépasse une seule lecture de la période est économisé. rows_loaded / bytes_loaded : table en mémoire,
+    # tout l'historique chargé, partagé par les périodes et les sessions.
+    def savings(self):
+        rows = []
+        for name, frame in self.tables.items():
+            views = self.views[name]
+            charts = sum(c for c, _, _ in views)
+            rows.append({
+                'table': name,
+                'charts': charts,
+                'round_trips_saved': max(charts - 1, 0),
+                'rows_loaded': len(frame),
+                'rows_saved': sum(c * r for c, r, _ in views) - max((r for _, r, _ in views), default=0),
+                'bytes_loaded': int(frame.memory_usage(deep=True).sum()),
+                'bytes_saved': sum(c * b for c, _, b in views) - max((b for _, _, b in views), default=0),
+            })
+        return pd.DataFrame(rows)
+
+
+# Charger toutes les tables sources pour la période et les groupes choisis (requêtes en parallèle).
+# Une table déjà en mémoire n'est relue que si elle est périmée, et seulement à partir de son watermark ;
+# au démarrage, les snapshots locaux sont servis pendant que MySQL est relu en arrière-plan.
+# `tables` : sous-ensemble des tables sources (mode SQL : seules celles que les graphiques lisent encore telles quelles)
+# `partition` : équipe affichée (ses tables sont gardées lors d'une éviction)
+def load_dataset(engine, start, end, group_ids, agent_ids, tables=None, partition=None):
+    first, last = history_range(start, end)
+    if (first, last, group_ids, agent_ids) in _oversized:
+        first, last = start, end
+    names = tables or TABLES
+    sources = {name: get_table(engine, name, first, last, group_ids, agent_ids, partition) for name in names}
+    try:
+        tables = load_tables(sources)
+    except MemoryLimitExceeded:
+        if (first, last) == (start, end):
+            raise
+        # Historique au-delà de STREAM_MEMORY_LIMIT_MB : ses tables sont abandonnées et, pour ces groupes et agents,
+        # seule la période affichée est chargée désormais (un changement de période relance alors les requêtes)
+        _oversized.add((first, last, group_ids, agent_ids))
+        with _tables_lock:
+            for key in [key for key, table in _tables.items() if table in sources.values()]:
+                del _tables[key]
+        tables = None
+    if tables is None:
+        return load_dataset(engine, start, end, group_ids, agent_ids, names, partition)
+    rollups = sources['distribution'].derive('rollups', Rollups, incremental=True) if 'distribution' in sources else None
+    status = [
+        {'table': name, 'rows': len(table.frame), 'watermark': table.watermark, **table.last_refresh}
+        for name, table in sources.items()
+    ]
+
+    dataset = Dataset(tables, period=(pd.Timestamp(start), pd.Timestamp(end)))
+    dataset.status = pd.DataFrame(status)
+    dataset.as_of, dataset.refreshing = freshness(sources.values())
+    dataset.rollups = rollups
+
+    # Jointure distribution x tadiplus faite en mémoire au lieu d'une deuxième lecture de v3_tadiplus_tickets_distri,
+    # une seule fois par version des deux tables (et non à chaque rerun de chaque session)
+    if 'distribution' in sources and 'tadiplus' in sources:
+        dataset.tables['distribution'] = sources['distribution'].derive('with_tadiplus', _join_tadiplus, sources['tadiplus'])
+        # Résumé (jour, groupe, agent) partagé par les graphiques par agent, vu comme une table du jeu de données
+        dataset.tables['agent_summary'] = sources['distribution'].derive('agent_summary', agent_summary, sources['tadiplus'])
+        dataset.views['agent_summary'] = []
+    _evict(keep=partition)
+    return dataset
+
+
+# Historiques dont le premier chargement a dépassé STREAM_MEMORY_LIMIT_MB : (début, fin, groupes, agents)
+_oversized = set()
+
+
+# Dates chargées pour une période demandée. Une période incluse dans l'historique récent charge tout l'historique :
+# du 1er du mois d'il y a HISTORY_DAYS jours à la fin du mois de la semaine en cours. Ces bornes ne changent
+# qu'une fois par mois, de sorte que la clé des tables (et l'id de leurs snapshots) reste la même d'un jour à l'autre.
+# Une période en dehors (ex. une semaine de l'an dernier) ne charge que ses propres dates.
+def history_range(start, end):
+    today = date.today()
+    first = (today - timedelta(days=HISTORY_DAYS)).replace(day=1)
+    week_end = today + timedelta(days=6 - today.weekday())
+    last = (week_end.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)  # Dernier jour du mois
+    if start < first or end > last:
+        return start, end
+    return first, last
+
+
+def _join_tadiplus(distribution, tadiplus):
+    return distribution.merge(tadiplus[JOIN_KEYS + TADIPLUS_JOIN_COLUMNS], on=JOIN_KEYS, how='left')
@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import create_engine, event
+
+
+# --- CONNEXION MYSQL ---
+# Un seul engine (et donc un seul pool de connexions) par process, partagé par toutes les sessions et tous les reruns :
+# les requêtes réutilisent des connexions déjà ouvertes au lieu de refaire TCP + authentification à chaque fois.
+DB_POOL_SIZE = int(st.secrets.get('DB_POOL_SIZE', 5))  # Connexions gardées ouvertes
+DB_MAX_OVERFLOW = int(st.secrets.get('DB_MAX_OVERFLOW', 10))  # Connexions supplémentaires temporaires en cas de pic
+DB_POOL_TIMEOUT = int(st.secrets.get('DB_POOL_TIMEOUT', 30))  # Attente max d'une connexion libre (secondes)
+DB_POOL_RECYCLE = int(st.secrets.get('DB_POOL_RECYCLE', 3600))  # Renouveler une connexion plus vieille que (secondes)
+DB_POOL_PRE_PING = bool(st.secrets.get('DB_POOL_PRE_PING', True))  # Vérifier la connexion avant usage (coupures MySQL)
+
+
+# Compteurs du pool, mis à jour par les événements SQLAlchemy et par connection()
+class PoolMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0  # Connexions physiques ouvertes (handshakes)
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds):
+        with self.lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+
+metrics = PoolMetrics()
+
+
+def _count(attribute):
+    def listener(*args):
+        with metrics.lock:
+            setattr(metrics, attribute, getattr(metrics, attribute) + 1)
+    return listener
+
+
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    connection_string = (
+        f"mysql+pymysql://{st.secrets['DB_USER']}:{st.secrets['DB_PASSWORD']}@{st.secrets['DB_HOST']}/{st.secrets['DB_NAME']}"
+    )
+    engine = create_engine(
+        connection_string,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    event.listen(engine, 'connect', _count('connects'))
+    event.listen(engine, 'checkout', _count('checkouts'))
+    return engine
+
+
+# Connexion empruntée au pool ; le temps d'attente (pool plein ou ouverture d'une connexion) est mesuré
+@contextmanager
+def connection(engine):
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        metrics.record_wait(time.perf_counter() - started)
+        yield conn
+
+
+# État du pool pour le panneau de diagnostic
+def pool_status(engine):
+    pool = engine.pool
+    with metrics.lock:
+        waits = metrics.waits
+        status = {
+            'pool_size': getattr(pool, 'size', lambda: None)(),
+            'checked_out': getattr(pool, 'checkedout', lambda: None)(),
+            'overflow': getattr(pool, 'overflow', lambda: None)(),
+            'idle': getattr(pool, 'checkedin', lambda: None)(),
+            'connections_opened': metrics.connects,
+            'checkouts': metrics.checkouts,
+            'avg_wait_ms': 1000 * metrics.wait_total / waits if waits else 0.0,
+            'max_wait_ms': 1000 * metrics.wait_max,
+        }
+    return pd.DataFrame([{'metric': name, 'value': None if value is None else float(value)} for name, value in status.items()])
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+# --- BUDGET DE TAILLE DES FIGURES ENVOYÉES AU NAVIGATEUR ---
+# Chaque figure est mesurée (JSON sérialisé) à sa construction. Au-delà du budget :
+# 'warn'    : la figure est envoyée telle quelle, avec un avertissement sous le graphique
+# 'degrade' : des réductions sont appliquées une par une jusqu'à repasser sous le budget
+CHART_PAYLOAD_BUDGET = int(st.secrets.get('CHART_PAYLOAD_BUDGET', 1_000_000))  # En octets
+CHART_PAYLOAD_ACTION = st.secrets.get('CHART_PAYLOAD_ACTION', 'degrade')
+
+_payloads = {}
+_payloads_lock = threading.Lock()
+
+
+def payload_size(fig):
+    return len(fig.to_json())
+
+
+# Tableaux float64 des traces (x, y, z) convertis en float32 : moitié moins d'octets, précision suffisante à l'écran
+def _float32_arrays(fig):
+    changed = False
+    for trace in fig.data:
+        for attr in ('x', 'y', 'z'):
+            values = trace[attr] if attr in trace else None
+            if values is None:
+                continue
+            array = np.asarray(values)
+            if array.dtype == np.float64:
+                trace[attr] = array.astype(np.float32)
+                changed = True
+    return changed
+
+
+# Un seul tick par valeur sur les axes à ticks explicites (tickvals / ticktext)
+def _dedup_ticks(fig):
+    changed = []
+
+    def dedup(axis):
+        if axis.tickvals is None:
+            return
+        values = pd.Series(list(axis.tickvals))
+        first = ~values.duplicated().to_numpy()
+        if first.all():
+            return
+        axis.tickvals = values[first].tolist()
+        if axis.ticktext is not None:
+            axis.ticktext = [text for text, keep in zip(axis.ticktext, first) if keep]
+        changed.append(True)
+
+    fig.for_each_xaxis(dedup)
+    fig.for_each_yaxis(dedup)
+    return bool(changed)
+
+
+# Annotations posées une par une (valeur de chaque case, de chaque point)
+def _drop_annotations(fig):
+    if not fig.layout.annotations:
+        return False
+    fig.layout.annotations = []
+    return True
+
+
+# Textes affichés point par point (les valeurs restent visibles au survol)
+def _drop_text(fig):
+    changed = False
+    for trace in fig.data:
+        if 'text' in trace and trace.text is not None:
+            trace.text = None
+            if 'texttemplate' in trace:
+                trace.texttemplate = None
+            changed = True
+    return changed
+
+
+# Réductions dans l'ordre, de la moins visible à la plus visible
+DEGRADATIONS = [
+    ('float32', _float32_arrays),
+    ('dedup_ticks', _dedup_ticks),
+    ('drop_annotations', _drop_annotations),
+    ('drop_text', _drop_text),
+]
+
+
+# Mesure la figure et la réduit si nécessaire ; retourne (figure, statistiques)
+def fit_budget(fig, budget=None, action=None):
+    budget = CHART_PAYLOAD_BUDGET if budget is None else budget
+    action = CHART_PAYLOAD_ACTION if action is None else action
+    size = original = payload_size(fig)
+    steps = []
+    if size > budget and action == 'degrade':
+        for step, degrade in DEGRADATIONS:
+            if degrade(fig):
+                steps.append(step)
+                size = payload_size(fig)
+                if size <= budget:
+                    break
+    stats = {
+        'title': fig.layout.title.text,
+        'bytes': size,
+        'original_bytes': original,
+        'traces': len(fig.data),
+        'annotations': len(fig.layout.annotations),
+        'degraded': ', '.join(steps),
+        'over_budget': size > budget,
+    }
+    return fig, stats
+
+
+# Dernière mesure de chaque graphique (tous utilisateurs du process confondus)
+def record_payload(name, stats, render_seconds):
+    with _payloads_lock:
+        _payloads[(name, stats['title'])] = dict(stats, chart=name, render_seconds=render_seconds, measured_at=time.time())
+
+
+# Graphiques les plus lourds en premier
+def payload_report():
+    with _payloads_lock:
+        rows = list(_payloads.values())
+    if not rows:
+        return pd.DataFrame()
+    columns = ['chart', 'title', 'bytes', 'original_bytes', 'build_seconds', 'render_seconds', 'traces', 'annotations', 'degraded']
+    return pd.DataFrame(rows)[columns].sort_values('bytes', ascending=False, ignore_index=True)
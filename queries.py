@@ -0,0 +1,344 @@
+from sqlalchemy import bindparam, text
+
+
+# --- REQUÊTES SQL DU DASHBOARD ---
+# Chaque requête contient un emplacement {where} rempli par build_where() :
+# les filtres (dates, groupes, agents) sont appliqués côté MySQL avec des paramètres liés.
+
+# Agents de la liste à afficher (nom -> agent_id)
+QUERY_AGENTS = '''
+    SELECT
+        a.agent_id,
+        a.agent
+    FROM fd_agent_id a
+    WHERE a.agent IN :agent_names
+'''
+
+# Équipe lue dans une table de composition (ROSTER_SOURCE = 'table', nom de la table dans {table}) :
+# membres dont l'appartenance [effective_from, effective_to] recoupe la période choisie (NULL = sans limite)
+QUERY_ROSTER = '''
+    SELECT DISTINCT
+        r.agent_id,
+        a.agent
+    FROM {table} r
+    JOIN fd_agent_id a ON r.agent_id = a.agent_id
+    WHERE r.team = :team
+        AND (r.effective_from IS NULL OR r.effective_from <= :end)
+        AND (r.effective_to IS NULL OR r.effective_to >= :start)
+'''
+
+# Groupes dans lesquels les agents ont traité des tickets (options du filtre "Select Groups")
+QUERY_GROUPS = '''
+    SELECT DISTINCT
+        d.group_id,
+        g.group as group_name
+    FROM v3_tickets_distribution_by_group_and_agent d
+    LEFT JOIN fd_group_id g ON d.group_id = g.group_id
+    {where}
+'''
+
+QUERY_DISTRIBUTION = '''
+    SELECT
+        d.date,
+        d.group_id,
+        d.agent_id,
+        d.occurrences,
+        a.agent,  -- Supposons que fd_agent_id a une colonne agent_name
+        g.group as group_name   -- Supposons que fd_group_id a une colonne group_name
+    FROM v3_tickets_distribution_by_group_and_agent d
+    LEFT JOIN fd_agent_id a
+        ON d.agent_id = a.agent_id
+    LEFT JOIN fd_group_id g
+        ON d.group_id = g.group_id
+    {where}
+'''
+
+QUERY_TICKETS_CREATED = '''
+    SELECT
+        t.date,
+        t.group_id,
+        t.time_slot,
+        t.ticket_count,
+        g.group as group_name
+    FROM v3_ticket_created_counts t
+    LEFT JOIN fd_group_id g ON t.group_id = g.group_id
+    {where}
+'''
+
+QUERY_AGENT_ACTIONS = '''
+    SELECT
+        t.date,
+        t.group_id,
+        t.time_slot,
+        t.agent_id,
+        t.action_count as ticket_count,
+        g.group as group_name,
+        a.agent
+    FROM v3_agent_action_counts t
+    LEFT JOIN fd_group_id g ON t.group_id = g.group_id
+    LEFT JOIN fd_agent_id a ON t.agent_id = a.agent_id
+    {where}
+'''
+
+QUERY_GROUP_KPIS = '''
+    SELECT
+        gk.date,
+        gk.group_id,
+        gk.mean_answer,
+        gk.mean_first_answer,
+        gk.sla_1st_perc,
+        gk.sla_solution_perc,
+        g.group as group_name,
+        gk.nb_tickets
+    FROM v3_group_kpis gk
+    LEFT JOIN fd_group_id g ON gk.group_id = g.group_id
+    {where}
+'''
+
+# Une seule requête pour v3_tadiplus_tickets_distri : toutes les colonnes utilisées par le dashboard
+# (jointure avec la distribution, temps de réponse, heatmaps SLA, évolution des métriques)
+QUERY_TADIPLUS = '''
+    SELECT
+        t.date,
+        t.group_id,
+        t.agent_id,
+        a.agent,
+        g.group as group_name,
+        t.occurrences,
+        t.sum_first_time_reply,
+        t.mean_first_time_reply,
+        t.sum_answer_time,
+        t.mean_answer_time,
+        t.sla_1st_response,  -- SLA 1st Response Compliance
+        t.perc_sla  -- Percentage SLA Compliance
+    FROM v3_tadiplus_tickets_distri t
+    LEFT JOIN fd_group_id g ON t.group_id = g.group_id
+    LEFT JOIN fd_agent_id a ON t.agent_id = a.agent_id
+    {where}
+'''
+
+
+# --- CONSTRUCTION DE LA CLAUSE WHERE ---
+# Retourne le texte "WHERE ..." et le dictionnaire des paramètres liés.
+# Une liste d'ids vide signifie "aucune ligne" (et non "pas de filtre") : on émet 1 = 0.
+def build_where(alias, start=None, end=None, group_ids=None, agent_ids=None):
+    clauses = []
+    params = {}
+
+    if start is not None and end is not None:
+        clauses.append(f"{alias}.date BETWEEN :start AND :end")
+        params['start'] = start
+        params['end'] = end
+
+    for column, ids in (('group_id', group_ids), ('agent_id', agent_ids)):
+        if ids is None:
+            continue
+        ids = sorted({int(i) for i in ids})  # Ordre stable pour que la clé de cache soit identique
+        if not ids:
+            clauses.append("1 = 0")
+            continue
+        clauses.append(f"{alias}.{column} IN :{column}s")
+        params[f"{column}s"] = ids
+
+    where = "WHERE " + "\n        AND ".join(clauses) if clauses else ""
+    return where, params
+
+
+# Préparer une requête avec ses filtres : retourne (texte SQL, paramètres)
+def filtered_query(query, alias, **filters):
+    where, params = build_where(alias, **filters)
+    return query.format(where=where), params
+
+
+# Transformer le texte SQL en requête SQLAlchemy : les listes deviennent des IN (...) "expanding"
+def to_statement(query, params):
+    statement = text(query)
+    expanding = [bindparam(name, expanding=True) for name, value in (params or {}).items() if isinstance(value, (list, tuple))]
+    if expanding:
+        statement = statement.bindparams(*expanding)
+    return statement
+
+
+# --- AGRÉGATS CALCULÉS PAR MYSQL (mode AGGREGATION_MODE = 'sql') ---
+# Chaque graphique déclare la table source, ses dimensions et ses mesures ; MySQL fait le GROUP BY
+# et ne renvoie que les lignes agrégées. Une mesure porte le nom de sa colonne source :
+#   ('sum', colonne)  |  ('avg', colonne)  |  ('wmean', colonne, poids) = sum(colonne * poids) / sum(poids)
+# Pour 'wmean', une valeur ou un poids NULL n'entre ni au numérateur ni au dénominateur (comme weighted_mean).
+# `not_null` : lignes ignorées si l'une de ces colonnes est NULL (équivalent du dropna des graphiques).
+# `by_agent=False` : table sans colonne agent_id, le filtre par agent ne s'applique pas.
+AGGREGATES = {
+    'tickets_by_group': dict(
+        table='distribution', query=QUERY_DISTRIBUTION, alias='d',
+        dims=['group_name'], measures={'occurrences': ('sum', 'occurrences')},
+    ),
+    'tickets_by_agent': dict(
+        table='distribution', query=QUERY_DISTRIBUTION, alias='d',
+        dims=['group_name', 'agent'], measures={'occurrences': ('sum', 'occurrences')},
+    ),
+    'team_total': dict(
+        table='distribution', query=QUERY_DISTRIBUTION, alias='d',
+        dims=['group_name'], measures={'occurrences': ('sum', 'occurrences')},
+    ),
+    'time_series': dict(
+        table='distribution', query=QUERY_DISTRIBUTION, alias='d',
+        dims=['date'], measures={'occurrences': ('sum', 'occurrences')},
+    ),
+    'tickets_per_time_slot': dict(
+        table='tickets_created', query=QUERY_TICKETS_CREATED, alias='t', by_agent=False,
+        dims=['time_slot', 'group_name'], measures={'ticket_count': ('sum', 'ticket_count')},
+    ),
+    'agent_actions_per_time_slot': dict(
+        table='agent_actions', query=QUERY_AGENT_ACTIONS, alias='t',
+        dims=['time_slot', 'agent'], measures={'ticket_count': ('sum', 'ticket_count')},
+    ),
+    'metric_over_time': dict(
+        table='tadiplus', query=QUERY_TADIPLUS, alias='t',
+        dims=['date', 'group_name', 'agent'],
+        measures={
+            'occurrences': ('sum', 'occurrences'),
+            'mean_answer_time': ('wmean', 'mean_answer_time', 'occurrences'),
+            'sla_1st_response': ('wmean', 'sla_1st_response', 'occurrences'),
+            'perc_sla': ('wmean', 'perc_sla', 'occurrences'),
+        },
+        not_null=['sla_1st_response', 'perc_sla', 'mean_answer_time'],
+    ),
+    'response_time_heatmap': dict(
+        table='tadiplus', query=QUERY_TADIPLUS, alias='t',
+        dims=['agent', 'group_name'], measures={'mean_answer_time': ('avg', 'mean_answer_time')},
+        not_null=['mean_answer_time'],
+    ),
+    'sla_heatmap': dict(
+        table='tadiplus', query=QUERY_TADIPLUS, alias='t',
+        dims=['agent', 'group_name'],
+        measures={'sla_1st_response': ('avg', 'sla_1st_response'), 'perc_sla': ('avg', 'perc_sla')},
+        not_null=['sla_1st_response', 'perc_sla'],
+    ),
+}
+
+
+# Requête GROUP BY d'un agrégat : la requête de la table (avec ses filtres) devient une sous-requête
+def aggregate_query(spec, **filters):
+    if not spec.get('by_agent', True):
+        filters.pop('agent_ids', None)
+    base, params = filtered_query(spec['query'], spec['alias'], **filters)
+    columns = [f"src.{dim}" for dim in spec['dims']]
+    for name, (function, column, *weight) in spec['measures'].items():
+        if function == 'sum':
+            expression = f"SUM(src.{column})"
+        elif function == 'avg':
+            expression = f"AVG(1.0 * src.{column})"
+        elif function == 'wmean':
+            valid = f"src.{column} IS NOT NULL AND src.{weight[0]} IS NOT NULL"
+            expression = (
+                f"SUM(CASE WHEN {valid} THEN 1.0 * src.{column} * src.{weight[0]} END)"
+                f" / NULLIF(SUM(CASE WHEN {valid} THEN src.{weight[0]} END), 0)"
+            )
+        else:
+            raise ValueError(f"unknown aggregate function: {function}")
+        columns.append(f"{expression} AS {name}")
+
+    not_null = spec.get('not_null', [])
+    where = "WHERE " + " AND ".join(f"src.{column} IS NOT NULL" for column in not_null) if not_null else ""
+    group_by = f"GROUP BY {', '.join(f'src.{dim}' for dim in spec['dims'])}" if spec['dims'] else ""
+    sql = f"SELECT {', '.join(columns)}\n    FROM ({base}) AS src\n    {where}\n    {group_by}"
+    return sql, params
+
+
+# --- VÉRIFICATION : python queries.py ---
+# Compare, sur une base SQLite de test, les agrégats calculés en SQL à ceux du mode mémoire : résumé
+# (jour, groupe, agent) de rollups.py pour les graphiques par agent, regroupements pandas des graphiques sinon
+if __name__ == "__main__":
+    import sqlite3
+    from datetime import date, timedelta
+
+    import numpy as np
+    import pandas as pd
+
+    from aggregations import weighted_mean, roll_up
+    from rollups import agent_summary, summary_tickets
+    from schema import apply_schema
+
+    rng = np.random.default_rng(0)
+    db = sqlite3.connect(':memory:')
+    agents = pd.DataFrame({'agent_id': range(1, 9), 'agent': [f"Agent {i}" for i in range(1, 9)]})
+    groups = pd.DataFrame({'group_id': range(1, 6), 'group': [f"Group {i}" for i in range(1, 6)]})
+    agents.to_sql('fd_agent_id', db, index=False)
+    groups.to_sql('fd_group_id', db, index=False)
+
+    days = [(date(2025, 1, 1) + timedelta(days=i)).isoformat() for i in range(60)]
+    keys = pd.MultiIndex.from_product([days, groups['group_id'], agents['agent_id']], names=['date', 'group_id', 'agent_id'])
+    facts = keys.to_frame(index=False).sample(frac=0.6, random_state=0)
+    n = len(facts)
+
+    def with_nulls(values, share=0.1):
+        values = values.astype('float64')
+        values[rng.random(len(values)) < share] = np.nan
+        return values
+
+    facts.assign(occurrences=rng.integers(0, 30, n)).to_sql('v3_tickets_distribution_by_group_and_agent', db, index=False)
+    facts.assign(
+        occurrences=rng.integers(0, 30, n),
+        sum_first_time_reply=rng.uniform(0, 1e5, n), mean_first_time_reply=rng.uniform(0, 1e4, n),
+        sum_answer_time=rng.uniform(0, 1e6, n), mean_answer_time=with_nulls(rng.uniform(60, 90_000, n)),
+        sla_1st_response=with_nulls(rng.uniform(0, 100, n)), perc_sla=with_nulls(rng.uniform(0, 100, n)),
+    ).to_sql('v3_tadiplus_tickets_distri', db, index=False)
+    slots = pd.MultiIndex.from_product([days, groups['group_id'], [f"{h:02}:00:00" for h in range(24)]], names=['date', 'group_id', 'time_slot'])
+    slots.to_frame(index=False).assign(ticket_count=lambda f: rng.integers(0, 10, len(f))).to_sql('v3_ticket_created_counts', db, index=False)
+    facts.merge(pd.DataFrame({'time_slot': [f"{h:02}:00:00" for h in range(0, 24, 3)]}), how='cross').assign(
+        action_count=lambda f: rng.integers(0, 5, len(f))
+    ).to_sql('v3_agent_action_counts', db, index=False)
+
+    def read(sql, params):
+        # SQLite : `group` doit être entre guillemets ; IN :liste -> une valeur liée par élément
+        sql = sql.replace('g.group ', 'g."group" ')
+        for name, value in list(params.items()):
+            if isinstance(value, (list, tuple)):
+                names = [f"{name}_{i}" for i in range(len(value))]
+                sql = sql.replace(f":{name}", "(" + ", ".join(f":{item}" for item in names) + ")")
+                params = {**{k: v for k, v in params.items() if k != name}, **dict(zip(names, value))}
+        return pd.read_sql(sql, db, params=params)
+
+    filters = dict(start='2025-01-10', end='2025-02-20', group_ids=[1, 2, 4], agent_ids=[1, 2, 3, 5, 8])
+
+    # Chemin du mode mémoire d'app.py pour les graphiques par agent : tables typées -> résumé -> roll_up
+    def typed(table, query, alias):
+        return apply_schema(read(*filtered_query(query, alias, **filters)), table)
+
+    summary = agent_summary(typed('distribution', QUERY_DISTRIBUTION, 'd'), typed('tadiplus', QUERY_TADIPLUS, 't'))
+    FROM_SUMMARY = {
+        'tickets_by_agent': lambda: summary_tickets(summary, ['group_name', 'agent']),
+        'team_total': lambda: summary_tickets(summary, ['group_name']),
+        'response_time_heatmap': lambda: roll_up(summary, ['agent', 'group_name'], means=['mean_answer_time'], weighted=False),
+        'sla_heatmap': lambda: roll_up(summary, ['agent', 'group_name'], means=['sla_1st_response', 'perc_sla'], weighted=False),
+    }
+
+    all_ok = True
+    for name, spec in AGGREGATES.items():
+        dims = spec['dims']
+        from_sql = read(*aggregate_query(spec, **filters)).sort_values(dims, ignore_index=True)
+
+        if name in FROM_SUMMARY:
+            expected = FROM_SUMMARY[name]()
+            expected = expected.astype({dim: str for dim in dims}).sort_values(dims, ignore_index=True)
+            # Cases sans aucune valeur : absentes ou vides selon le chemin, invisibles dans les heatmaps
+            measures = list(spec['measures'])
+            from_sql = from_sql.dropna(subset=measures, how='all').reset_index(drop=True)
+            expected = expected.dropna(subset=measures, how='all').reset_index(drop=True)
+        else:
+            raw_filters = filters if spec.get('by_agent', True) else {k: v for k, v in filters.items() if k != 'agent_ids'}
+            raw = read(*filtered_query(spec['query'], spec['alias'], **raw_filters)).dropna(subset=spec.get('not_null', []))
+            expected = raw[dims].drop_duplicates().sort_values(dims, ignore_index=True)
+            for measure, (function, column, *weight) in spec['measures'].items():
+                if function == 'wmean':
+                    values = weighted_mean(raw, dims, [column], weight=weight[0]).drop(columns=weight[0])
+                else:
+                    values = raw.groupby(dims, as_index=False)[column].agg('sum' if function == 'sum' else 'mean')
+                expected = expected.merge(values.rename(columns={column: measure}), on=dims, how='left')
+
+        same = len(from_sql) == len(expected) and all(
+            np.allclose(from_sql[measure].astype('float64'), expected[measure].astype('float64'), equal_nan=True)
+            for measure in spec['measures']
+        ) and from_sql[dims].astype(str).equals(expected[dims].astype(str))
+        all_ok &= same
+        print(f"{name:>28}: {len(from_sql):>5} rows {'OK' if same else 'DIFFERENT'}")
+    print("all aggregates match:", all_ok)
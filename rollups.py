@@ -0,0 +1,128 @@
+import pandas as pd
+
+from aggregations import additive_columns, roll_up
+from schema import category_mask, concat_typed
+
+
+# --- CUBES D'AGRÉGATS PAR PÉRIODE ---
+# Échelle de temps -> (fréquence pandas, nom de la colonne X du graphique)
+TIME_SCALES = {
+    'Daily': ('D', 'date'),
+    'Weekly': ('W', 'Week_Range'),  # Semaine ISO (lundi -> dimanche)
+    'Monthly': ('M', 'Month'),
+    'Quarterly': ('Q', 'Quarter'),
+}
+
+
+# Début de période de chaque ligne : calculé sur les dates uniques seulement, puis redistribué
+def period_start(dates, freq):
+    codes, uniques = pd.factorize(dates, sort=False)
+    starts = pd.DatetimeIndex(uniques).to_period(freq).start_time
+    return pd.Series(starts.take(codes), index=dates.index)
+
+
+# Libellé affiché sur l'axe X (calculé uniquement sur les quelques périodes du résultat)
+def period_label(starts, freq):
+    if freq == 'D':
+        return starts.dt.date
+    if freq == 'M':
+        return starts.dt.strftime("%B %Y")  # Ex: "February 2025"
+    return starts.dt.to_period(freq).astype(str)  # Ex: "2025-02-03/2025-02-09", "2025Q1"
+
+
+# Cubes (début de période, groupe, agent) -> occurrences, à la maille jour, semaine, mois et trimestre.
+# Construits une fois par chargement, mis à jour seulement pour les périodes touchées par un rafraîchissement.
+class Rollups:
+    def __init__(self, frame, dims=('group_name', 'agent'), measure='occurrences'):
+        self.dims = list(dims)
+        self.measure = measure
+        self.cubes = {}
+        for freq, _ in TIME_SCALES.values():
+            self.cubes[freq] = self._cube(frame, freq)
+
+    def _cube(self, frame, freq):
+        cube = frame[self.dims + [self.measure]].copy()
+        cube['start'] = period_start(frame['date'], freq)
+        return cube.groupby(['start'] + self.dims, dropna=False, observed=True, as_index=False)[self.measure].sum()
+
+    # Rafraîchissement incrémental : les lignes à partir de `since` ont changé
+    def update(self, frame, since):
+        cubes = {}
+        for freq, cube in self.cubes.items():
+            first = pd.Period(since, freq).start_time
+            changed = self._cube(frame[frame['date'] >= first], freq)
+            cubes[freq] = concat_typed([cube[cube['start'] < first], changed])
+        self.cubes = cubes  # Remplacement en une fois : une lecture en cours voit l'ancienne ou la nouvelle version
+
+    def _slice(self, cube, agents, groups):
+        mask = pd.Series(True, index=cube.index)
+        if agents is not None and 'agent' in self.dims:
+            mask &= category_mask(cube['agent'], agents)
+        if groups is not None and 'group_name' in self.dims:
+            mask &= category_mask(cube['group_name'], groups)
+        return cube[mask]
+
+    # Total par période sur [start, end] : les périodes complètes viennent du cube de la période,
+    # les périodes coupées par les bornes sont recalculées à partir du cube journalier.
+    def series(self, time_scale, start, end, agents=None, groups=None):
+        freq, x_column = TIME_SCALES[time_scale]
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize()
+
+        cubes = self.cubes
+        days = self._slice(cubes['D'], agents, groups)
+        days = days[(days['start'] >= start) & (days['start'] <= end)]
+
+        if freq == 'D':
+            parts = [days]
+        else:
+            first_full = pd.Period(start, freq)
+            if first_full.start_time < start:
+                first_full += 1
+            last_full = pd.Period(end, freq)
+            if last_full.end_time.normalize() > end:
+                last_full -= 1
+
+            coarse = self._slice(cubes[freq], agents, groups)
+            coarse = coarse[(coarse['start'] >= first_full.start_time) & (coarse['start'] <= last_full.start_time)]
+
+            edges = days[(days['start'] < first_full.start_time) | (days['start'] > last_full.end_time)].copy()
+            edges['start'] = period_start(edges['start'], freq)
+            parts = [coarse, edges]
+
+        result = pd.concat(parts, ignore_index=True).groupby('start', as_index=False)[self.measure].sum()
+        result[x_column] = period_label(result['start'], freq)
+        return result[[x_column, self.measure]], x_column
+
+
+# --- RÉSUMÉ PAR (JOUR, GROUPE, AGENT) ---
+# Une ligne par jour, groupe et agent : tickets traités (distribution), nombre de lignes de distribution
+# (0 : le couple n'existe que dans tadiplus) et colonnes additives des métriques de tadiplus
+# (aggregations.additive_columns). Calculé une fois par rafraîchissement des deux tables, trié par date ;
+# les graphiques par agent et par groupe en tirent leurs chiffres avec aggregations.roll_up (simples sommes).
+# Les deux SLA ne comptent que les jours où les deux sont renseignés (même règle que le dropna d'origine).
+SUMMARY_KEYS = ['date', 'group_name', 'agent']
+SLA_METRICS = ['sla_1st_response', 'perc_sla']
+SUMMARY_METRICS = ['mean_answer_time'] + SLA_METRICS
+
+
+def agent_summary(distribution, tadiplus):
+    tickets = distribution[SUMMARY_KEYS + ['occurrences']].assign(distribution_rows=1)
+    metrics = pd.DataFrame(
+        {
+            **{key: tadiplus[key] for key in SUMMARY_KEYS},
+            **additive_columns(tadiplus, ['mean_answer_time']),
+            **additive_columns(tadiplus, SLA_METRICS, together=True),
+        },
+        index=tadiplus.index,
+    )
+    combined = concat_typed([tickets, metrics])
+    summary = combined.groupby(SUMMARY_KEYS, as_index=False, observed=True, sort=True).sum()  # Colonne absente d'un côté : 0
+    counts = ['occurrences', 'distribution_rows'] + [f"{metric}__n" for metric in SUMMARY_METRICS]
+    return summary.astype({column: 'int64' for column in counts})
+
+
+# Tickets traités par regroupement du résumé (seulement les couples présents dans la distribution)
+def summary_tickets(summary, by):
+    totals = roll_up(summary, by, sums=['occurrences', 'distribution_rows'])
+    return totals[totals['distribution_rows'] > 0].drop(columns='distribution_rows').reset_index(drop=True)
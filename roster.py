@@ -0,0 +1,64 @@
+import pandas as pd
+import streamlit as st
+
+from queries import QUERY_AGENTS, QUERY_ROSTER
+from data_access import load_dimension
+
+
+# --- ÉQUIPE AFFICHÉE ---
+# 'config' : liste `roster` de l'équipe dans st.secrets, des noms ou des entrées {agent, effective_from, effective_to}
+# 'table'  : table ROSTER_TABLE (team, agent_id, effective_from, effective_to), lignes de l'équipe choisie
+# L'équipe est résolue en agent_id une fois par période, mise en cache avec les tables de dimension,
+# et ces agent_id filtrent toutes les requêtes côté MySQL.
+ROSTER_SOURCE = st.secrets.get('ROSTER_SOURCE', 'config')
+TEAM = st.secrets.get('TEAM', 'Tadiplus')  # Équipe affichée par défaut
+ROSTER_TABLE = st.secrets.get('ROSTER_TABLE', 'team_roster')
+
+# Équipe par défaut (liste historiquement codée en dur dans app.py)
+DEFAULT_ROSTER = [
+    "Lisette Hapke", "Kerstin Rosskamp", "Sebastian Grund", "David Priemer",
+    "Daniela Kolb", "Mario Krieger", "Christopher Loehr", "Jochen Wittmann",
+    "Marion Nebrich", "Andreas Hombergs", "Michael Doodt", "Gabi Tiedtke",
+    "Kayleigh Perkins", "Jacqueline Forstner", "Samuel Siegle", "Barbara Habermann",
+    "Sandra Bulka", "Holger Koepff", "Marcel Gruber", "Chantal Schloeßer"
+]
+ROSTER = st.secrets.get('ROSTER', DEFAULT_ROSTER)
+
+# --- ÉQUIPES SERVIES PAR LE DASHBOARD ---
+# nom -> {label : libellé de la barre "total de l'équipe", color : sa couleur, roster : membres (mode 'config')}
+# Ex. dans secrets.toml :  [TEAMS.Tadiplus]  label = "Total Tadiplus"  color = "rgb(6, 47, 104)"  roster = [...]
+TEAMS = st.secrets.get('TEAMS', {TEAM: {'label': f"Total {TEAM}", 'color': 'rgb(6, 47, 104)', 'roster': ROSTER}})
+
+
+# Réglages d'une équipe, avec les valeurs par défaut
+def team_settings(team):
+    settings = TEAMS[team]
+    return {
+        'label': settings.get('label', f"Total {team}"),
+        'color': settings.get('color', 'rgb(6, 47, 104)'),
+        'roster': settings.get('roster', []),
+    }
+
+
+# Noms des membres actifs à un moment de [start, end] ; une entrée sans dates est toujours active
+def active_names(entries, start, end):
+    names = []
+    for entry in entries:
+        if isinstance(entry, str):
+            names.append(entry)
+            continue
+        first, last = entry.get('effective_from'), entry.get('effective_to')
+        if (first is None or pd.Timestamp(first) <= pd.Timestamp(end)) and (last is None or pd.Timestamp(last) >= pd.Timestamp(start)):
+            names.append(entry['agent'])
+    return list(dict.fromkeys(names))
+
+
+# Membres d'une équipe sur la période : DataFrame (agent_id, agent)
+def load_roster(engine, team, start, end):
+    if ROSTER_SOURCE == 'table':
+        query = QUERY_ROSTER.format(table=ROSTER_TABLE)
+        roster = load_dimension(engine, 'roster', query, {'team': team, 'start': start, 'end': end})
+    else:
+        names = active_names(team_settings(team)['roster'], start, end)
+        roster = load_dimension(engine, 'agents', QUERY_AGENTS, {'agent_names': names})
+    return roster.drop_duplicates('agent_id', ignore_index=True)
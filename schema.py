@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+from aggregations import minute_of_day
+
+
+# --- TYPES DES COLONNES CHARGÉES ---
+# 'date'     : datetime64[ns] normalisé à minuit
+# 'minute'   : créneau horaire en minutes depuis minuit (Int16), décalage horaire appliqué
+# 'category' : dimensions répétées (noms d'agents, de groupes)
+# 'id'       : identifiants (int32)
+# 'count'    : compteurs (int32, une valeur manquante compte 0)
+# 'metric'   : durées et pourcentages (float32)
+SCHEMAS = {
+    'distribution': {
+        'date': 'date', 'group_id': 'id', 'agent_id': 'id', 'occurrences': 'count',
+        'agent': 'category', 'group_name': 'category',
+    },
+    'tadiplus': {
+        'date': 'date', 'group_id': 'id', 'agent_id': 'id', 'agent': 'category', 'group_name': 'category',
+        'occurrences': 'count', 'sum_first_time_reply': 'metric', 'mean_first_time_reply': 'metric',
+        'sum_answer_time': 'metric', 'mean_answer_time': 'metric', 'sla_1st_response': 'metric', 'perc_sla': 'metric',
+    },
+    'tickets_created': {
+        'date': 'date', 'group_id': 'id', 'time_slot': 'minute', 'ticket_count': 'count', 'group_name': 'category',
+    },
+    'agent_actions': {
+        'date': 'date', 'group_id': 'id', 'time_slot': 'minute', 'agent_id': 'id', 'ticket_count': 'count',
+        'group_name': 'category', 'agent': 'category',
+    },
+    'group_kpis': {
+        'date': 'date', 'group_id': 'id', 'mean_answer': 'metric', 'mean_first_answer': 'metric',
+        'sla_1st_perc': 'metric', 'sla_solution_perc': 'metric', 'group_name': 'category', 'nb_tickets': 'count',
+    },
+}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+# Appliquer les types déclarés en une passe vectorisée ; refuse toute colonne manquante ou inattendue.
+# partial=True : sous-ensemble des colonnes de la table (agrégats SQL : dimensions et mesures choisies).
+def apply_schema(frame, table, time_slot_offset_minutes=0, partial=False):
+    schema = SCHEMAS[table]
+    unexpected = [column for column in frame.columns if column not in schema]
+    missing = [] if partial else [column for column in schema if column not in frame.columns]
+    if unexpected or missing:
+        raise SchemaError(f"{table}: unexpected columns {unexpected}, missing columns {missing}")
+
+    typed = {}
+    for column, kind in schema.items():
+        if column not in frame.columns:
+            continue
+        values = frame[column]
+        if kind == 'date':
+            typed[column] = pd.to_datetime(values, errors='coerce').dt.normalize()
+        elif kind == 'minute':
+            typed[column] = minute_of_day(values, time_slot_offset_minutes)
+        elif kind == 'category':
+            typed[column] = pd.Categorical(values, categories=sorted(values.dropna().unique()))
+        elif kind == 'id':
+            typed[column] = pd.to_numeric(values, errors='coerce').astype('int32')
+        elif kind == 'count':
+            typed[column] = pd.to_numeric(values, errors='coerce').fillna(0).astype('int32')
+        elif kind == 'metric':
+            typed[column] = pd.to_numeric(values, errors='coerce').astype('float32')
+    return pd.DataFrame(typed, index=frame.index)
+
+
+# Concaténer des morceaux typés sans perdre les colonnes catégorielles (union triée des catégories)
+def concat_typed(frames):
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return None
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            categories = sorted(set().union(*(frame[column].cat.categories for frame in frames)))
+            frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+# --- FILTRES SUR LES DIMENSIONS ---
+# Masque "valeur dans la sélection" calculé sur les codes entiers d'une colonne catégorielle :
+# la sélection est traduite une fois en codes (quelques dizaines de catégories),
+# puis chaque ligne est testée par une simple lecture dans un tableau de booléens.
+def category_mask(values, selected):
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.isin(selected).to_numpy()
+    wanted = values.cat.categories.get_indexer(pd.Index(list(selected)))
+    allowed = np.zeros(len(values.cat.categories) + 1, dtype=bool)
+    allowed[wanted[wanted >= 0]] = True
+    return allowed[values.cat.codes.to_numpy()]  # code -1 (valeur manquante) -> dernière case, toujours False
+
+
+# --- FILTRE SUR LA PÉRIODE ---
+# Les tables sont triées par date au chargement : la période [start, end] est une tranche contiguë,
+# trouvée par deux recherches dichotomiques (O(log n)) et retournée comme une vue, sans masque sur toute la colonne.
+def sort_by_date(frame):
+    if frame is None or frame['date'].is_monotonic_increasing:
+        return frame
+    return frame.sort_values('date', kind='stable', ignore_index=True)
+
+
+def date_slice(frame, start, end):
+    dates = frame['date'].to_numpy()
+    first = dates.searchsorted(np.datetime64(pd.Timestamp(start)), side='left')
+    last = dates.searchsorted(np.datetime64(pd.Timestamp(end)), side='right')
+    return frame.iloc[first:last]
+
+
+# --- BENCHMARK : python schema.py ---
+# Compare le filtre sur codes catégoriels à isin sur des chaînes (ancien comportement de app.py)
+if __name__ == "__main__":
+    import sys
+    import time
+
+    rng = np.random.default_rng(0)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000  # Nombre de lignes, réduit par les tests
+    agents = rng.choice([f"Agent {i}" for i in range(40)], n)
+    selected = [f"Agent {i}" for i in range(0, 40, 3)]
+    strings = pd.Series(agents, dtype=object)
+    categories = pd.Series(pd.Categorical(agents))
+
+    for name, function in (
+        ('isin (object)', lambda: strings.isin(selected).to_numpy()),
+        ('category_mask', lambda: category_mask(categories, selected)),
+    ):
+        started = time.perf_counter()
+        mask = function()
+        print(f"{name:>14}: {time.perf_counter() - started:.3f}s ({int(mask.sum())} rows)")
+    print(f"memory: object {strings.memory_usage(deep=True) / 1e6:.1f} MB, category {categories.memory_usage(deep=True) / 1e6:.1f} MB")
+    print("same results:", (strings.isin(selected).to_numpy() == category_mask(categories, selected)).all())
+
+    # Période : masque booléen sur toute la colonne comparé à la tranche par recherche dichotomique
+    frame = sort_by_date(pd.DataFrame({'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 730, n), unit='D')}))
+    start, end = pd.Timestamp('2025-03-03'), pd.Timestamp('2025-03-09')
+    print()
+    for name, function in (
+        ('boolean mask', lambda: frame[(frame['date'] >= start) & (frame['date'] <= end)]),
+        ('date_slice', lambda: date_slice(frame, start, end)),
+    ):
+        started = time.perf_counter()
+        result = function()
+        print(f"{name:>14}: {time.perf_counter() - started:.4f}s ({len(result)} rows)")
+    print("same results:", date_slice(frame, start, end).equals(frame[(frame['date'] >= start) & (frame['date'] <= end)]))
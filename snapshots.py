@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+
+# --- SNAPSHOTS LOCAUX (PARQUET) ---
+# Chaque table chargée depuis MySQL est aussi écrite sur disque au format Parquet compressé.
+# Au démarrage, le dashboard relit ces fichiers (memory-mapped) au lieu d'attendre MySQL,
+# et un manifest garde pour chaque snapshot l'heure de chargement et le watermark.
+SNAPSHOT_DIR = st.secrets.get('SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+SNAPSHOT_COMPRESSION = st.secrets.get('SNAPSHOT_COMPRESSION', 'zstd')
+SNAPSHOT_MAX_ENTRIES = int(st.secrets.get('SNAPSHOT_MAX_ENTRIES', 256))  # Au-delà : suppression des plus anciens
+
+MANIFEST_FILE = 'manifest.json'
+# À incrémenter quand le format des colonnes chargées change : les anciens snapshots sont alors ignorés
+SNAPSHOT_FORMAT = 3
+_manifest_lock = threading.Lock()
+
+
+# Identifiant d'un snapshot : nom de la table + empreinte des filtres (période, groupes, agents)
+def snapshot_id(name, key):
+    digest = hashlib.sha1(repr((SNAPSHOT_FORMAT, key)).encode('utf-8')).hexdigest()[:16]
+    return f"{name}-{digest}"
+
+
+def _path(snapshot):
+    return os.path.join(SNAPSHOT_DIR, f"{snapshot}.parquet")
+
+
+def _read_manifest():
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+# Écriture atomique : fichier temporaire puis os.replace (jamais de manifest à moitié écrit)
+def _write_manifest(manifest):
+    path = os.path.join(SNAPSHOT_DIR, MANIFEST_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def save_snapshot(snapshot, frame, watermark, loaded_at):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = _path(snapshot)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    pq.write_table(table, path + '.tmp', compression=SNAPSHOT_COMPRESSION)
+    os.replace(path + '.tmp', path)
+
+    with _manifest_lock:
+        manifest = _read_manifest()
+        manifest[snapshot] = {
+            'loaded_at': loaded_at,
+            'saved_at': time.time(),
+            'watermark': None if watermark is None else pd.Timestamp(watermark).isoformat(),
+            'rows': len(frame),
+            'bytes': os.path.getsize(path),
+            'columns': list(frame.columns),
+        }
+
+        # Garder seulement les snapshots les plus récents
+        for old in sorted(manifest, key=lambda s: manifest[s]['saved_at'])[:max(len(manifest) - SNAPSHOT_MAX_ENTRIES, 0)]:
+            del manifest[old]
+            if os.path.exists(_path(old)):
+                os.remove(_path(old))
+
+        _write_manifest(manifest)
+
+
+# Retourne (DataFrame, entrée du manifest), ou (None, None) si le snapshot n'existe pas ou est illisible
+def load_snapshot(snapshot):
+    entry = _read_manifest().get(snapshot)
+    if entry is None or not os.path.exists(_path(snapshot)):
+        return None, None
+    try:
+        frame = pq.read_table(_path(snapshot), memory_map=True).to_pandas()
+    except (OSError, pa.ArrowException):
+        return None, None
+    if list(frame.columns) != entry['columns']:
+        return None, None
+    watermark = entry['watermark']
+    entry = dict(entry, watermark=None if watermark is None else pd.Timestamp(watermark))
+    return frame, entry
+
+
+# Contenu du manifest pour le panneau de diagnostic
+def snapshot_report():
+    manifest = _read_manifest()
+    rows = [
+        {
+            'snapshot': snapshot,
+            'rows': entry['rows'],
+            'bytes': entry['bytes'],
+            'watermark': entry['watermark'],
+            'loaded_at': pd.Timestamp(entry['loaded_at'], unit='s'),
+        }
+        for snapshot, entry in manifest.items()
+    ]
+    return pd.DataFrame(rows)
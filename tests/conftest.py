@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+from streamlit import config
+
+# Les modules du dashboard sont à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Les modules lisent st.secrets dès l'import : secrets de test, snapshots écrits dans un dossier temporaire
+_secrets_dir = tempfile.mkdtemp(prefix='dashboard-tests-')
+_secrets_file = os.path.join(_secrets_dir, 'secrets.toml')
+with open(_secrets_file, 'w') as file:
+    file.write(f"SNAPSHOT_DIR = '{os.path.join(_secrets_dir, 'snapshots')}'\n")
+config.set_option('secrets.files', [_secrets_file])
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(script, *args):
+    result = subprocess.run(
+        [sys.executable, script, *args], cwd=ROOT, capture_output=True, text=True, env={**os.environ, 'PYTHONWARNINGS': 'ignore'}
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+# Les vérifications des blocs __main__ : chaque comparaison « same results » doit réussir
+@pytest.mark.parametrize('script, args', [('schema.py', ['20000']), ('aggregations.py', ['2000'])])
+def test_benchmark_results_match(script, args):
+    checks = [line for line in run(script, *args).splitlines() if line.startswith('same results:')]
+    assert checks
+    assert all(line == 'same results: True' for line in checks), checks
+
+
+# Requêtes SQL agrégées (mode SQL d'app.py) comparées au chemin en mémoire, sur SQLite
+def test_sql_aggregates_match_memory_path():
+    output = run('queries.py')
+    assert 'all aggregates match: True' in output, output
@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+import sqlalchemy
+from sqlalchemy import event, text
+
+from data_access import IncrementalTable, REFRESH_LOOKBACK_DAYS
+from rollups import Rollups
+
+# Période chargée : se termine aujourd'hui, sinon le rafraîchissement est sauté (agrégats définitifs)
+END = pd.Timestamp.today().normalize()
+START = END - timedelta(days=40)
+GROUP_IDS = (1, 2, 3)
+AGENT_IDS = (1, 2, 3, 4)
+
+
+def day(timestamp):
+    return timestamp.strftime('%Y-%m-%d')
+
+
+# Base SQLite avec les tables lues par la distribution : groupes 1-2 et agents 1-3 ont des lignes
+# jusqu'à hier, le groupe 3 et l'agent 4 n'en ont aucune (destinations des lignes déplacées)
+@pytest.fixture
+def engine(tmp_path):
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'tickets.sqlite'}")
+
+    # SQLite : `group` est un mot réservé, à mettre entre guillemets (MySQL accepte g.group)
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def quote_group(conn, cursor, statement, parameters, context, executemany):
+        return statement.replace('g.group ', 'g."group" '), parameters
+
+    rng = np.random.default_rng(0)
+    days = pd.date_range(START, END - timedelta(days=1))
+    keys = pd.MultiIndex.from_product([days.strftime('%Y-%m-%d'), [1, 2], [1, 2, 3]], names=['date', 'group_id', 'agent_id'])
+    with engine.begin() as conn:
+        pd.DataFrame({'agent_id': AGENT_IDS, 'agent': [f"Agent {i}" for i in AGENT_IDS]}).to_sql('fd_agent_id', conn, index=False)
+        pd.DataFrame({'group_id': GROUP_IDS, 'group': [f"Group {i}" for i in GROUP_IDS]}).to_sql('fd_group_id', conn, index=False)
+        keys.to_frame(index=False).assign(occurrences=rng.integers(1, 30, len(keys))).to_sql(
+            'v3_tickets_distribution_by_group_and_agent', conn, index=False
+        )
+    yield engine
+    engine.dispose()
+
+
+def execute(engine, sql, **params):
+    with engine.begin() as conn:
+        conn.execute(text(sql), params)
+
+
+def loaded(engine):
+    table = IncrementalTable('distribution', engine, START, END, GROUP_IDS, AGENT_IDS)
+    table.refresh()
+    return table
+
+
+def assert_same_rows(frame, expected):
+    pd.testing.assert_frame_equal(
+        frame.reset_index(drop=True), expected.reset_index(drop=True), check_categorical=False
+    )
+
+
+# Une ligne relue qui a changé de groupe ou d'agent remplace l'ancienne au lieu de s'y ajouter
+@pytest.mark.parametrize('column, value', [('group_id', 3), ('agent_id', 4)])
+def test_row_moved_inside_the_window_is_counted_once(engine, column, value):
+    table = loaded(engine)
+    total = table.frame['occurrences'].sum()
+
+    execute(
+        engine,
+        f"UPDATE v3_tickets_distribution_by_group_and_agent SET {column} = :value "
+        "WHERE date = :day AND group_id = 1 AND agent_id = 1",
+        value=value, day=day(table.watermark),
+    )
+    table.refresh()
+
+    assert table.last_refresh['mode'] == 'incremental'
+    assert table.frame['occurrences'].sum() == total
+    assert_same_rows(table.frame, table._fetch(table.start))
+
+
+# Ligne supprimée dans la base : elle disparaît aussi de la table en mémoire
+def test_row_deleted_inside_the_window_is_dropped(engine):
+    table = loaded(engine)
+    rows = len(table.frame)
+
+    execute(
+        engine,
+        "DELETE FROM v3_tickets_distribution_by_group_and_agent WHERE date = :day AND group_id = 2 AND agent_id = 3",
+        day=day(table.watermark),
+    )
+    table.refresh()
+
+    assert len(table.frame) == rows - 1
+    assert_same_rows(table.frame, table._fetch(table.start))
+
+
+# Seuls les jours à partir de watermark - REFRESH_LOOKBACK_DAYS sont relus ; les jours plus anciens sont définitifs
+def test_only_the_lookback_window_is_read_again(engine):
+    table = loaded(engine)
+    since = table.watermark - timedelta(days=REFRESH_LOOKBACK_DAYS)
+    before = since - timedelta(days=1)
+
+    execute(engine, "UPDATE v3_tickets_distribution_by_group_and_agent SET occurrences = 999 WHERE date = :day", day=day(before))
+    execute(engine, "UPDATE v3_tickets_distribution_by_group_and_agent SET occurrences = 500 WHERE date = :day", day=day(since))
+    execute(
+        engine,
+        "INSERT INTO v3_tickets_distribution_by_group_and_agent (date, group_id, agent_id, occurrences) VALUES (:day, 1, 1, 7)",
+        day=day(END),
+    )
+    table.refresh()
+
+    frame = table.frame
+    assert table.last_refresh['mode'] == 'incremental'
+    assert table.last_refresh['rows_fetched'] == (frame['date'] >= since).sum()
+    assert not (frame.loc[frame['date'] == before, 'occurrences'] == 999).any()
+    assert (frame.loc[frame['date'] == since, 'occurrences'] == 500).all()
+    assert table.watermark == END
+    assert frame['date'].is_monotonic_increasing
+
+
+# Les cubes mis à jour par _set(since=...) sont ceux qu'une reconstruction complète donnerait
+def test_rollups_update_matches_a_rebuild(engine):
+    table = loaded(engine)
+    rollups = table.derive('rollups', Rollups, incremental=True)
+
+    execute(
+        engine,
+        "UPDATE v3_tickets_distribution_by_group_and_agent SET group_id = 3, occurrences = occurrences + 5 "
+        "WHERE date = :day AND agent_id = 2",
+        day=day(table.watermark),
+    )
+    execute(
+        engine,
+        "INSERT INTO v3_tickets_distribution_by_group_and_agent (date, group_id, agent_id, occurrences) VALUES (:day, 2, 4, 11)",
+        day=day(END),
+    )
+    table.refresh()
+
+    assert table.derive('rollups', Rollups, incremental=True) is rollups  # Mis à jour, pas reconstruit
+    rebuilt = Rollups(table.frame)
+    for freq, cube in rollups.cubes.items():
+        columns = ['start'] + rollups.dims
+        assert_same_rows(cube.sort_values(columns), rebuilt.cubes[freq].sort_values(columns))